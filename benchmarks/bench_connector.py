@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Latency of a burst of concurrent calls on a cold session, with the
+default aiohttp connector and with the tuned connector after warming up
+one connection per call of the burst
+
+The stand-in server charges HANDSHAKE seconds for every new connection.
+
+Run from the repository root: python3 -m benchmarks.bench_connector
+"""
+import asyncio
+from statistics import median
+from time import perf_counter
+
+import aiohttp
+
+from bittrex.asyncsession import BittrexAsyncSession
+from benchmarks.server import StandInServer
+
+HANDSHAKE = 0.05
+LATENCY = 0.002
+BURST = 50
+MARKETS = [f'BTC-C{index:03d}' for index in range(BURST)]
+
+
+async def timed(call):
+    start = perf_counter()
+    await call
+    return perf_counter() - start
+
+
+async def burst(session):
+    start = perf_counter()
+    latencies = await asyncio.gather(
+        *(timed(session.get_ticker(market)) for market in MARKETS)
+    )
+    return perf_counter() - start, sorted(latencies)
+
+
+async def run(server, name, session, warm_up):
+    server.attach(session)
+    server.reset()
+
+    async with session:
+        if warm_up:
+            await session.warm_up(BURST)
+        warm_connections = server.connections
+
+        for round_ in ('cold', 'warm'):
+            before = server.connections
+            elapsed, latencies = await burst(session)
+            print(f'{name:<10}{round_:<6}{warm_connections:>6}'
+                  f'{server.connections - before:>8}'
+                  f'{elapsed * 1000:>10.1f}'
+                  f'{median(latencies) * 1000:>10.1f}'
+                  f'{latencies[int(len(latencies) * 0.99)] * 1000:>10.1f}')
+
+
+async def main():
+    with StandInServer(HANDSHAKE, LATENCY) as server:
+        print(f'{"connector":<10}{"burst":<6}{"warmed":>6}{"opened":>8}'
+              f'{"total ms":>10}{"p50 ms":>10}{"p99 ms":>10}')
+
+        default = BittrexAsyncSession('key', 'secret', coalesce=False)
+        default.session = aiohttp.ClientSession()
+        await run(server, 'default', default, warm_up=False)
+
+        for limit_per_host in (0, 10):
+            tuned = BittrexAsyncSession(
+                'key', 'secret', coalesce=False, limit_per_host=limit_per_host
+            )
+            await run(server, f'tuned/{limit_per_host}', tuned, warm_up=True)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
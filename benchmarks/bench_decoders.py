@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""End to end decode + _parse_response time per installed json decoder
+
+Run from the repository root: python3 -m benchmarks.bench_decoders
+"""
+from timeit import repeat
+
+from bittrex.base import BittrexBaseSession
+from bittrex.decoders import available_decoders
+from benchmarks import fixtures
+
+PAYLOADS = {
+    'getmarketsummaries': fixtures.dumps(fixtures.market_summaries()),
+    'GetTicks': fixtures.dumps(fixtures.candles()),
+}
+
+
+def main():
+    decoders = available_decoders()
+    session = BittrexBaseSession('key', 'secret')
+
+    print(f'{"payload":<20}{"decoder":<10}{"decode ms":>12}{"total ms":>12}')
+    for name, body in PAYLOADS.items():
+        for decoder_name, decoder in decoders.items():
+            decode = min(repeat(lambda: decoder(body), number=1, repeat=5))
+            total = min(repeat(
+                lambda: session._parse_response(decoder(body)),
+                number=1, repeat=5
+            ))
+            print(f'{name:<20}{decoder_name:<10}'
+                  f'{decode * 1000:>12.2f}{total * 1000:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Memory held by Response items versus slotted records
+
+Run from the repository root: python3 -m benchmarks.bench_records
+"""
+import gc
+import tracemalloc
+
+from bittrex.response import Response
+from bittrex.records import Candle
+from benchmarks import fixtures
+
+ROWS = 100000
+
+
+def retained(build, rows):
+    """Bytes still allocated after building items from rows"""
+    gc.collect()
+    tracemalloc.start()
+    items = build(rows)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return size
+
+
+def main():
+    rows = fixtures.candles(ROWS)['result']
+
+    results = {
+        'Response': retained(
+            lambda rows: [Response.from_dict(row) for row in rows], rows
+        ),
+        'Candle': retained(
+            lambda rows: [Candle.from_dict(row) for row in rows], rows
+        ),
+    }
+
+    baseline = results['Response']
+    print(f'{ROWS} candle rows')
+    for name, size in results.items():
+        print(f'{name:<10}{size / 2 ** 20:>10.1f} MiB'
+              f'{size / ROWS:>10.0f} B/row{size / baseline:>8.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Rows/sec of Response construction, before and after the key cache
+
+Run from the repository root: python3 -m benchmarks.bench_response
+"""
+import re
+import time
+from timeit import repeat
+
+from bittrex.response import Response
+from benchmarks import fixtures
+
+
+class LegacyResponse:
+    """Response as it was before key caching and fast timestamp parsing"""
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            if key in ['Created', 'TimeStamp', 'Opened', 'Closed',
+                       'LastChecked', 'T', 'LastUpdated'] \
+                    and value is not None:
+                try:
+                    timestamp = time.mktime(
+                        time.strptime(value, '%Y-%m-%dT%H:%M:%S.%f')
+                    )
+                except ValueError:
+                    timestamp = time.mktime(
+                        time.strptime(value, '%Y-%m-%dT%H:%M:%S')
+                    )
+                setattr(self, self._convert_to_camel(key), timestamp)
+            else:
+                setattr(self, self._convert_to_camel(key), value)
+
+    @staticmethod
+    def _convert_to_camel(name):
+        s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
+        return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+
+
+PAYLOADS = {
+    'getmarkets': fixtures.markets(),
+    'getmarketsummaries': fixtures.market_summaries(),
+    'getmarkethistory': fixtures.market_history(),
+    'GetTicks': fixtures.candles(),
+}
+
+
+def rows_per_second(cls, rows, number=3):
+    best = min(repeat(
+        lambda: [cls(**row) for row in rows], number=1, repeat=number
+    ))
+    return len(rows) / best
+
+
+def main():
+    print(f'{"payload":<20}{"rows":>8}{"before":>14}{"after":>14}{"gain":>8}')
+    for name, payload in PAYLOADS.items():
+        rows = payload['result']
+        before = rows_per_second(LegacyResponse, rows)
+        after = rows_per_second(Response, rows)
+        print(f'{name:<20}{len(rows):>8}{before:>14,.0f}{after:>14,.0f}'
+              f'{after / before:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
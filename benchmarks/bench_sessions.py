@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Throughput, p50/p99 latency and memory of BittrexSession,
+BittrexAsyncSession and _parse_response against the local stand-in
+server
+
+Run from the repository root: python3 -m benchmarks.bench_sessions
+Use --help for the latency, error injection and result mode options.
+"""
+import argparse
+import asyncio
+import gc
+import tracemalloc
+from time import perf_counter
+
+from bittrex.base import BittrexBaseSession
+from bittrex.endpoints import ENDPOINTS_BY_PATH
+from bittrex.session import BittrexSession
+from bittrex.asyncsession import BittrexAsyncSession
+from bittrex.exceptions import RequestError, ResponseError
+from benchmarks.server import StandInServer, ERRORS, default_routes
+
+MARKET = 'BTC-LTC'
+
+# name: (session method, arguments, route of the payload)
+CALLS = {
+    'markets': ('get_markets', (), 'public/getmarkets'),
+    'summaries': (
+        'get_market_summaries', (), 'public/getmarketsummaries'
+    ),
+    'summary': (
+        'get_market_summaries', (MARKET,), 'public/getmarketsummary'
+    ),
+    'ticker': ('get_ticker', (MARKET,), 'public/getticker'),
+    'history': (
+        'get_market_history', (MARKET,), 'public/getmarkethistory'
+    ),
+    'order book': ('get_order_book', (MARKET,), 'public/getorderbook'),
+    'candles': (
+        'get_candles', (MARKET, 'five_min'), 'pub/market/GetTicks'
+    ),
+    'latest candle': (
+        'get_latest_candle', (MARKET, 'five_min'),
+        'pub/market/GetLatestTick'
+    ),
+}
+
+
+def percentile(latencies, q):
+    """q-th quantile of sorted latencies"""
+    if not latencies:
+        return float('nan')
+    return latencies[min(int(len(latencies) * q), len(latencies) - 1)]
+
+
+def peak_memory(call):
+    """Peak bytes allocated while running call"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        call()
+    except (RequestError, ResponseError):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def report(name, elapsed, latencies, errors, memory):
+    latencies.sort()
+    count = len(latencies) + errors
+    print(f'{name:<16}{count / elapsed:>10.0f}'
+          f'{percentile(latencies, 0.5) * 1000:>10.3f}'
+          f'{percentile(latencies, 0.99) * 1000:>10.3f}'
+          f'{errors:>8}{memory / 1024:>12.0f}')
+
+
+def header(title):
+    print(f'\n{title}')
+    print(f'{"call":<16}{"calls/s":>10}{"p50 ms":>10}{"p99 ms":>10}'
+          f'{"errors":>8}{"peak KiB":>12}')
+
+
+def bench_parse(options):
+    """_parse_response on decoded payloads, without any network"""
+    session = BittrexBaseSession(
+        'key', 'secret', result_mode=options.result_mode
+    )
+    routes = default_routes()
+
+    header(f'_parse_response, result_mode={options.result_mode}')
+    for name, (_, _, route) in CALLS.items():
+        data = session.decoder(routes[route])
+        record = ENDPOINTS_BY_PATH[route].record
+        latencies = []
+        start = perf_counter()
+        for _ in range(options.requests):
+            call_start = perf_counter()
+            session._parse_response(data, record)
+            latencies.append(perf_counter() - call_start)
+        elapsed = perf_counter() - start
+
+        memory = peak_memory(lambda: session._parse_response(data, record))
+        report(name, elapsed, latencies, 0, memory)
+
+
+def bench_sync(options, server):
+    session = server.attach(BittrexSession(
+        'key', 'secret', result_mode=options.result_mode,
+        retry=options.retry
+    ))
+
+    header(f'BittrexSession, result_mode={options.result_mode}')
+    for name, (method, args, _) in CALLS.items():
+        call = getattr(session, method)
+        latencies, errors = [], 0
+        start = perf_counter()
+        for _ in range(options.requests):
+            call_start = perf_counter()
+            try:
+                call(*args)
+            except (RequestError, ResponseError):
+                errors += 1
+                continue
+            latencies.append(perf_counter() - call_start)
+        elapsed = perf_counter() - start
+
+        memory = peak_memory(lambda: call(*args))
+        report(name, elapsed, latencies, errors, memory)
+    session.close()
+
+
+async def bench_async(options, server):
+    session = server.attach(BittrexAsyncSession(
+        'key', 'secret', result_mode=options.result_mode,
+        retry=options.retry, coalesce=False,
+        limit_per_host=options.concurrency
+    ))
+    semaphore = asyncio.Semaphore(options.concurrency)
+
+    async def timed(call, args, latencies):
+        async with semaphore:
+            start = perf_counter()
+            try:
+                await call(*args)
+            except (RequestError, ResponseError):
+                return 1
+            latencies.append(perf_counter() - start)
+            return 0
+
+    header(f'BittrexAsyncSession, concurrency={options.concurrency}, '
+           f'result_mode={options.result_mode}')
+    async with session:
+        await session.warm_up(options.concurrency)
+        for name, (method, args, _) in CALLS.items():
+            call = getattr(session, method)
+            latencies = []
+            start = perf_counter()
+            errors = sum(await asyncio.gather(*(
+                timed(call, args, latencies)
+                for _ in range(options.requests)
+            )))
+            elapsed = perf_counter() - start
+
+            gc.collect()
+            tracemalloc.start()
+            try:
+                await call(*args)
+            except (RequestError, ResponseError):
+                pass
+            _, memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report(name, elapsed, latencies, errors, memory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--requests', type=int, default=200,
+                        help='calls per endpoint')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='calls in flight in the async benchmark')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds the server waits per request')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests answered with an error')
+    parser.add_argument('--errors', nargs='+', choices=ERRORS,
+                        default=ERRORS, help='kinds of errors to inject')
+    parser.add_argument('--retry', action='store_true',
+                        help='retry idempotent calls')
+    parser.add_argument('--result-mode', default='response',
+                        choices=('response', 'records', 'lazy'))
+    parser.add_argument('--only', nargs='+',
+                        choices=('parse', 'sync', 'async'),
+                        default=('parse', 'sync', 'async'))
+    options = parser.parse_args()
+
+    if 'parse' in options.only:
+        bench_parse(options)
+    if not {'sync', 'async'} & set(options.only):
+        return
+
+    with StandInServer(latency=options.latency,
+                       error_rate=options.error_rate,
+                       errors=tuple(options.errors)) as server:
+        if 'sync' in options.only:
+            bench_sync(options, server)
+        if 'async' in options.only:
+            asyncio.run(bench_async(options, server))
+        print(f'\nserver: {server.requests} requests, '
+              f'{server.connections} connections, '
+              f'{server.injected} injected errors')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Order placement url building and signing, before and after the
+pre-keyed hmac and the endpoint url templates
+
+The generated _buy_limit and _cancel_order builders compile their urls
+with _build_url from the cached template of the endpoint.
+
+Run from the repository root: python3 -m benchmarks.bench_signing
+"""
+import hashlib
+import hmac
+from time import time
+from timeit import repeat
+from urllib.parse import urlencode
+
+from bittrex.base import BittrexBaseSession
+
+KEY = '0123456789abcdef0123456789abcdef'
+SECRET = 'fedcba9876543210fedcba9876543210'
+NUMBER = 100000
+
+
+class LegacySession:
+    """url building and signing as it was before"""
+
+    def __init__(self, key, secret, host='bittrex.com', version='v1.1'):
+        self.key = key
+        self.secret = secret
+        self.host = host
+        self.version = version
+
+    @property
+    def base_url(self):
+        return f'https://{self.host}/api/{self.version}/'
+
+    @property
+    def nonce(self):
+        return f"{int(time() * 1000)}"
+
+    def _sign_url(self, url):
+        return hmac.new(
+            self.secret.encode(),
+            url.encode(),
+            hashlib.sha512
+        ).hexdigest()
+
+    def _url(self, method, parameters=None):
+        url = f'{self.base_url}{method}'
+
+        if parameters is not None:
+            encoded_params = urlencode(parameters)
+            url += f'?{encoded_params}'
+
+        return url
+
+    def _buy_limit(self, market_name, quantity, rate):
+        params = {
+            'apikey': self.key,
+            'nonce': self.nonce,
+            'market': market_name,
+            'quantity': quantity,
+            'rate': rate
+        }
+        return self._url('market/buylimit', params)
+
+    def _cancel_order(self, uuid):
+        params = {
+            'apikey': self.key,
+            'nonce': self.nonce,
+            'uuid': uuid
+        }
+        return self._url('market/cancel', params)
+
+
+def place_and_cancel(session):
+    url = session._buy_limit('BTC-LTC', 1.5, 0.01925)
+    session._sign_url(url)
+    url = session._cancel_order('e606d53c-8d70-11e3-94b5-425861b86ab6')
+    session._sign_url(url)
+
+
+def microseconds(session):
+    best = min(repeat(
+        lambda: place_and_cancel(session), number=NUMBER, repeat=5
+    ))
+    return best / NUMBER * 1e6
+
+
+def main():
+    before = microseconds(LegacySession(KEY, SECRET))
+    after = microseconds(BittrexBaseSession(KEY, SECRET))
+    print('buy_limit + cancel_order url build and sign')
+    print(f'before {before:.2f} us  after {after:.2f} us  '
+          f'gain {before / after:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
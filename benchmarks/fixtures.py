@@ -0,0 +1,157 @@
+"""Payloads shaped like recorded bittrex api responses
+
+Every payload is generated from a recorded row so the benchmarks can run
+offline at realistic sizes. Generation is deterministic for a given size.
+"""
+import json
+import random
+import time
+
+MARKET = {
+    'MarketCurrency': 'LTC', 'BaseCurrency': 'BTC',
+    'MarketCurrencyLong': 'Litecoin', 'BaseCurrencyLong': 'Bitcoin',
+    'MinTradeSize': 0.01435906, 'MarketName': 'BTC-LTC', 'IsActive': True,
+    'Created': '2014-02-13T00:00:00', 'Notice': None, 'IsSponsored': None,
+    'LogoUrl': 'https://bittrexblobstorage.blob.core.windows.net/public/'
+               '6defbc41-582d-47a6-bb2e-d0fa88663524.png'
+}
+
+CURRENCY = {
+    'Currency': 'LTC', 'CurrencyLong': 'Litecoin', 'MinConfirmation': 6,
+    'TxFee': 0.01, 'IsActive': True, 'CoinType': 'BITCOIN',
+    'BaseAddress': 'LhyLNfBkoKshT7R8Pce6vkB9T2cP2o84hx', 'Notice': None
+}
+
+MARKET_SUMMARY = {
+    'MarketName': 'BTC-LTC', 'High': 0.01980001, 'Low': 0.01875,
+    'Volume': 55618.47025106, 'Last': 0.01925, 'BaseVolume': 1078.27380384,
+    'TimeStamp': '2018-03-23T12:00:05.14', 'Bid': 0.01924994,
+    'Ask': 0.01925, 'OpenBuyOrders': 2329, 'OpenSellOrders': 6437,
+    'PrevDay': 0.01951509, 'Created': '2014-02-13T00:00:00'
+}
+
+TICKER = {'Bid': 0.01924994, 'Ask': 0.01925, 'Last': 0.01925}
+
+TRADE = {
+    'Id': 152064181, 'TimeStamp': '2018-03-23T12:00:04.837',
+    'Quantity': 1.04127839, 'Price': 0.01925, 'Total': 0.02004460,
+    'FillType': 'FILL', 'OrderType': 'BUY'
+}
+
+ORDER_BOOK_ENTRY = {'Quantity': 12.37, 'Rate': 0.01924994}
+
+CANDLE = {
+    'O': 0.01929, 'H': 0.01931, 'L': 0.01925, 'C': 0.0193,
+    'V': 88.11795425, 'T': '2018-03-23T12:00:00', 'BV': 1.70039125
+}
+
+FIVE_MINUTES = 300
+
+
+def envelope(result, success=True, message=''):
+    """Wrap a result the same way the bittrex api does"""
+    return {'success': success, 'message': message, 'result': result}
+
+
+def _timestamp(epoch, fraction=True):
+    stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(epoch))
+    if fraction:
+        stamp += f'.{int(epoch * 1000) % 1000:03d}'
+    return stamp
+
+
+def markets(size=300):
+    rng = random.Random(size)
+    rows = []
+    for index in range(size):
+        row = dict(MARKET)
+        row['MarketCurrency'] = f'C{index:03d}'
+        row['MarketName'] = f'BTC-C{index:03d}'
+        row['MinTradeSize'] = round(rng.uniform(0.001, 100), 8)
+        rows.append(row)
+    return envelope(rows)
+
+
+def currencies(size=300):
+    rows = []
+    for index in range(size):
+        row = dict(CURRENCY)
+        row['Currency'] = f'C{index:03d}'
+        rows.append(row)
+    return envelope(rows)
+
+
+def market_summaries(size=300):
+    rng = random.Random(size)
+    rows = []
+    for index in range(size):
+        row = dict(MARKET_SUMMARY)
+        row['MarketName'] = f'BTC-C{index:03d}'
+        row['Last'] = round(rng.uniform(0.00001, 0.1), 8)
+        row['Bid'] = row['Last']
+        row['Ask'] = round(row['Last'] * 1.001, 8)
+        row['TimeStamp'] = _timestamp(1521806400 + index * 0.731)
+        rows.append(row)
+    return envelope(rows)
+
+
+def ticker():
+    return envelope(dict(TICKER))
+
+
+def market_history(size=200):
+    rng = random.Random(size)
+    rows = []
+    for index in range(size):
+        row = dict(TRADE)
+        row['Id'] = TRADE['Id'] - index
+        row['TimeStamp'] = _timestamp(1521806400 - index * 1.379)
+        row['Quantity'] = round(rng.uniform(0.01, 50), 8)
+        row['Price'] = round(rng.uniform(0.019, 0.0195), 8)
+        row['Total'] = round(row['Quantity'] * row['Price'], 8)
+        row['OrderType'] = 'BUY' if index % 2 else 'SELL'
+        rows.append(row)
+    return envelope(rows)
+
+
+def order_book(size=500, order_type='both'):
+    rng = random.Random(size)
+    buy, sell = [], []
+    for index in range(size):
+        buy.append({
+            'Quantity': round(rng.uniform(0.01, 500), 8),
+            'Rate': round(0.01924994 - index * 0.00000117, 8)
+        })
+        sell.append({
+            'Quantity': round(rng.uniform(0.01, 500), 8),
+            'Rate': round(0.01925 + index * 0.00000113, 8)
+        })
+
+    if order_type == 'buy':
+        return envelope(buy)
+    elif order_type == 'sell':
+        return envelope(sell)
+    return envelope({'buy': buy, 'sell': sell})
+
+
+def candles(size=10000, interval=FIVE_MINUTES):
+    rng = random.Random(size)
+    rows = []
+    price = CANDLE['O']
+    start = 1521806400 - size * interval
+    for index in range(size):
+        close = round(price * rng.uniform(0.995, 1.005), 8)
+        volume = round(rng.uniform(1, 200), 8)
+        rows.append({
+            'O': price, 'H': round(max(price, close) * 1.001, 8),
+            'L': round(min(price, close) * 0.999, 8), 'C': close,
+            'V': volume, 'T': _timestamp(start + index * interval, False),
+            'BV': round(volume * close, 8)
+        })
+        price = close
+    return envelope(rows)
+
+
+def dumps(payload):
+    """Encode a payload the way it comes off the wire"""
+    return json.dumps(payload, separators=(',', ':')).encode()
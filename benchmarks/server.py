@@ -0,0 +1,178 @@
+"""Local stand-in for the bittrex api
+
+A plain HTTP/1.1 keep-alive server running in a background thread,
+serving fixture payloads of the v1.1 and v2.0 apis at realistic sizes.
+Opening a connection costs a configurable handshake delay, standing in
+for the TCP and TLS handshakes with the real api, every request a
+configurable latency, and a fraction of the requests can be answered
+with injected errors.
+"""
+import asyncio
+import random
+import threading
+
+from benchmarks import fixtures
+
+# Injected errors
+STATUS = 'status'  # 503 Service Unavailable
+THROTTLE = 'throttle'  # 429 Too Many Requests
+FAILURE = 'failure'  # success false, INVALID_MARKET
+DISCONNECT = 'disconnect'  # connection closed without a response
+ERRORS = (STATUS, THROTTLE, FAILURE, DISCONNECT)
+
+
+def default_routes():
+    """endpoint to response body, matched on the end of the url path"""
+    summaries = fixtures.market_summaries()
+    return {
+        'public/getmarkets': fixtures.dumps(fixtures.markets()),
+        'public/getcurrencies': fixtures.dumps(fixtures.currencies()),
+        'public/getmarketsummaries': fixtures.dumps(summaries),
+        'public/getmarketsummary': fixtures.dumps(
+            fixtures.envelope(summaries['result'][:1])
+        ),
+        'public/getticker': fixtures.dumps(fixtures.ticker()),
+        'public/getmarkethistory': fixtures.dumps(fixtures.market_history()),
+        'public/getorderbook': fixtures.dumps(fixtures.order_book()),
+        'pub/market/GetTicks': fixtures.dumps(fixtures.candles()),
+        'pub/market/GetLatestTick': fixtures.dumps(fixtures.candles(1)),
+    }
+
+
+class StandInServer:
+    """Serve fixture bodies on 127.0.0.1
+
+    :param handshake: seconds before a new connection is served
+    :param latency: seconds before each response is sent
+    :param routes: dict of endpoint to body, see default_routes
+    :param error_rate: fraction of the requests answered with an error
+    :param errors: kinds of errors to inject, see ERRORS
+    :param seed: seed of the error injection
+
+    connections, requests and injected count what was served, paths
+    lists the path of every request.
+    """
+
+    def __init__(self, handshake=0.0, latency=0.0, routes=None,
+                 error_rate=0.0, errors=ERRORS, seed=0):
+        self.handshake = handshake
+        self.latency = latency
+        self.routes = routes or default_routes()
+        self.error_rate = error_rate
+        self.errors = errors
+        self.random = random.Random(seed)
+        self.connections = 0
+        self.requests = 0
+        self.injected = 0
+        self.paths = []
+        self.port = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._writers = set()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._serve, '127.0.0.1', 0)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop(self):
+        async def shutdown():
+            self._server.close()
+            # Closing the connections ends the handlers waiting on them
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def reset(self):
+        self.connections = 0
+        self.requests = 0
+        self.injected = 0
+        self.paths = []
+
+    def attach(self, session):
+        """Point the base urls of a bittrex session at this server"""
+        session._base_url = f'http://127.0.0.1:{self.port}/api/v1.1/'
+        session._base_url_v2 = f'http://127.0.0.1:{self.port}/Api/v2.0/'
+        session._templates = {}
+        return session
+
+    def _body(self, path):
+        path = path.split('?', 1)[0]
+        for endpoint, body in self.routes.items():
+            if path.endswith(endpoint):
+                return 200, body
+        return 404, b''
+
+    def _error(self):
+        """Returns the kind of error to inject or None"""
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.injected += 1
+            return self.random.choice(self.errors)
+        return None
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        self._writers.add(writer)
+        if self.handshake:
+            await asyncio.sleep(self.handshake)
+
+        try:
+            while True:
+                request = await reader.readuntil(b'\r\n\r\n')
+                method, path, _ = request.split(b' ', 2)
+                self.requests += 1
+                self.paths.append(path.decode())
+
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                error = self._error()
+                if error == DISCONNECT:
+                    break
+                elif error == STATUS:
+                    status, body = 503, b''
+                elif error == THROTTLE:
+                    status, body = 429, b''
+                elif error == FAILURE:
+                    status, body = 200, fixtures.dumps(
+                        fixtures.envelope(None, False, 'INVALID_MARKET')
+                    )
+                else:
+                    status, body = self._body(path.decode())
+
+                writer.write(
+                    f'HTTP/1.1 {status} OK\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(body)}\r\n\r\n'.encode()
+                )
+                if method != b'HEAD':
+                    writer.write(body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
@@ -0,0 +1,185 @@
+import fcntl
+import os
+import struct
+from .columns import numpy
+
+MAGIC = b'BTRXARC1'
+# magic, row size, committed row count, padded to 64 bytes
+HEADER = struct.Struct('<8sqq40x')
+COUNT_OFFSET = 16
+
+FILL_TYPES = ('FILL', 'PARTIAL_FILL')
+ORDER_TYPES = ('BUY', 'SELL')
+
+
+class Archive:
+    """Append only file of fixed width rows, readable as a memory map
+
+    Rows are written after the committed ones first and only then the
+    row count in the header is updated, so readers never see a partial
+    append. Only the last committed row is ever rewritten in place.
+    Writers serialize on an exclusive lock of the file.
+    """
+    fields = ()
+    key = None
+
+    def __init__(self, path):
+        if numpy is None:
+            raise ModuleNotFoundError('numpy is required for archives')
+
+        self.path = path
+        self.dtype = numpy.dtype(list(self.fields))
+
+        if not os.path.exists(path):
+            self._create()
+
+    def _create(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Create under a temporary name so nobody opens a headerless file,
+        # linking fails instead of replacing an archive that another
+        # process created in the meantime
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(temporary, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, self.dtype.itemsize, 0))
+            os.link(temporary, self.path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(temporary)
+
+    def _read_count(self, fd):
+        magic, row_size, count = HEADER.unpack(os.pread(fd, HEADER.size, 0))
+        if magic != MAGIC or row_size != self.dtype.itemsize:
+            raise ValueError(f'{self.path} is not a {type(self).__name__}')
+        return count
+
+    def __len__(self):
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            return self._read_count(fd)
+        finally:
+            os.close(fd)
+
+    def read(self):
+        """Returns the committed rows as a read only numpy memory map"""
+        count = len(self)
+        if not count:
+            return numpy.empty(0, dtype=self.dtype)
+
+        return numpy.memmap(
+            self.path, dtype=self.dtype, mode='r',
+            offset=HEADER.size, shape=(count,)
+        )
+
+    def columns(self):
+        """dict of column name to zero copy views on the committed rows"""
+        rows = self.read()
+        return {name: rows[name] for name in self.dtype.names}
+
+    def _to_rows(self, columns):
+        rows = numpy.empty(len(columns[self.key]), dtype=self.dtype)
+        for name in self.dtype.names:
+            rows[name] = columns[name]
+        return rows
+
+    def append(self, columns):
+        """Append the rows of columns newer than the archived ones
+
+        A row with the key of the last archived row replaces it, the
+        latest candle keeps changing until its interval closes.
+
+        :param columns: columns as returned by the as_columns option
+        :returns: number of rows appended
+        """
+        rows = numpy.sort(self._to_rows(columns), order=self.key)
+
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            count = self._read_count(fd)
+            start = count
+
+            if count:
+                last = numpy.frombuffer(os.pread(
+                    fd, self.dtype.itemsize,
+                    HEADER.size + (count - 1) * self.dtype.itemsize
+                ), dtype=self.dtype)[0][self.key]
+                rows = rows[rows[self.key] >= last]
+                if len(rows) and rows[self.key][0] == last:
+                    start = count - 1
+
+            if not len(rows):
+                return 0
+
+            os.pwrite(
+                fd, rows.tobytes(),
+                HEADER.size + start * self.dtype.itemsize
+            )
+            os.fsync(fd)
+            # Commit the rows
+            os.pwrite(
+                fd, struct.pack('<q', start + len(rows)), COUNT_OFFSET
+            )
+            return start + len(rows) - count
+        finally:
+            os.close(fd)
+
+
+class CandleArchive(Archive):
+    """Archive of get_candles for one market and interval
+
+    :param directory: directory holding the archives
+    :param market_name: Name of the market
+    :param tick_interval: one_min, five_min, thirty_min, hour or day
+    """
+    fields = (
+        ('t', '<i8'), ('o', '<f8'), ('h', '<f8'), ('l', '<f8'),
+        ('c', '<f8'), ('v', '<f8'), ('bv', '<f8'),
+    )
+    key = 't'
+
+    def __init__(self, directory, market_name, tick_interval):
+        self.market_name = market_name
+        self.tick_interval = tick_interval
+        self.source = ('get_candles', (market_name, tick_interval))
+        super().__init__(os.path.join(
+            directory, f'{market_name}.{tick_interval}.candles'
+        ))
+
+
+class TradeArchive(Archive):
+    """Archive of get_market_history for one market
+
+    fill_type and order_type are stored as indexes into FILL_TYPES and
+    ORDER_TYPES.
+
+    :param directory: directory holding the archives
+    :param market_name: Name of the market
+    """
+    fields = (
+        ('id', '<i8'), ('time_stamp', '<i8'), ('quantity', '<f8'),
+        ('price', '<f8'), ('total', '<f8'), ('fill_type', 'u1'),
+        ('order_type', 'u1'),
+    )
+    key = 'id'
+
+    def __init__(self, directory, market_name):
+        self.market_name = market_name
+        self.source = ('get_market_history', (market_name,))
+        super().__init__(os.path.join(directory, f'{market_name}.trades'))
+
+    def _to_rows(self, columns):
+        columns = dict(columns)
+        for name, values in (('fill_type', FILL_TYPES),
+                             ('order_type', ORDER_TYPES)):
+            column = numpy.asarray(columns[name])
+            if column.dtype.kind == 'U':
+                codes = numpy.full(len(column), 255, dtype='u1')
+                for code, value in enumerate(values):
+                    codes[column == value] = code
+                columns[name] = codes
+        return super()._to_rows(columns)
@@ -1,6 +1,17 @@
 from .base import BittrexBaseSession
+import asyncio
+from time import perf_counter
 import requests
-from .exceptions import ResponseError, RequestError
+from .ratelimit import AsyncRateLimiter, PRIORITY_PUBLIC
+from .exceptions import ResponseError, RequestError, HTTPStatusError
+from .records import (
+    Market, Currency, MarketSummary, Trade, OrderBook, OrderBookEntry,
+    Candle
+)
+from .summaries import SummaryPoller
+from .endpoints import add_endpoint_methods, async_method
+from .columns import CANDLE_COLUMNS, TRADE_COLUMNS
+from .stream import ResultStream
 
 try:
     import aiohttp
@@ -8,12 +19,83 @@ except ModuleNotFoundError:
     # Note: Async Bittrex client not available
     pass
 
+# Connections warm_up opens by default
+WARM_UP_CONNECTIONS = 4
 
-class BittrexAsyncSession(BittrexBaseSession):
 
-    def __init__(self, *args, **kwargs):
+class BittrexAsyncSession(BittrexBaseSession):
+    rate_limiter_class = AsyncRateLimiter
+
+    def __init__(self, *args, coalesce=True, limit=100, limit_per_host=0,
+                 ttl_dns_cache=300, keepalive_timeout=30,
+                 request_timeout=300, connect_timeout=30, read_timeout=None,
+                 **kwargs):
+        """Initialise session
+
+        The aiohttp session is created on first use, so the session can
+        be constructed outside of a running loop.
+
+        :param coalesce: let concurrent identical public calls share a
+            single in flight request
+        :param limit: connections open at most
+        :param limit_per_host: connections open at most to one host,
+            defaults to 0 for no limit besides limit
+        :param ttl_dns_cache: seconds to cache resolved hosts
+        :param keepalive_timeout: seconds to keep an idle connection open
+        :param request_timeout: seconds a request may take in total
+        :param connect_timeout: seconds to wait for a connection
+        :param read_timeout: seconds to wait for response data, ignored
+            before aiohttp 3.3
+        """
         super().__init__(*args, **kwargs)
-        self.session = aiohttp.ClientSession(loop=kwargs['loop'])
+        self.loop = kwargs.get('loop')
+        self.connector_options = {
+            'limit': limit,
+            'limit_per_host': limit_per_host,
+            'ttl_dns_cache': ttl_dns_cache,
+            'keepalive_timeout': keepalive_timeout,
+        }
+        if hasattr(aiohttp, 'ClientTimeout'):
+            self.timeout_options = {'timeout': aiohttp.ClientTimeout(
+                total=request_timeout, sock_connect=connect_timeout,
+                sock_read=read_timeout
+            )}
+        else:
+            # aiohttp before 3.3 only times the whole request and connecting
+            self.timeout_options = {
+                'read_timeout': request_timeout,
+                'conn_timeout': connect_timeout,
+            }
+        self._session = None
+        self.coalesce = coalesce
+        self._in_flight = {}
+        self._registry_refresh = None
+
+    @property
+    def session(self):
+        """aiohttp session, created on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(**self.connector_options)
+            options = {'connector': connector, **self.timeout_options}
+            if self.loop is not None:
+                options['loop'] = self.loop
+            self._session = aiohttp.ClientSession(**options)
+            # aiohttp sends a GET again when a connection drops before the
+            # response, which would place an order twice. Resends are left
+            # to the retry policy, as with the sync session.
+            if hasattr(self._session, '_retry_connection'):
+                self._session._retry_connection = False
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
 
     # NOTE: We need to properly close off the ClientSession().
     # The aiohttp developer mentioned best way is to register
@@ -21,22 +103,127 @@ class BittrexAsyncSession(BittrexBaseSession):
     # when using this in combination with aiohttp server
 
     async def close(self):
-        await self.session.close()
+        if self._registry_refresh is not None:
+            self._registry_refresh.cancel()
+            self._registry_refresh = None
+
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+    async def warm_up(self, connections=None):
+        """Open connections to the api host before they are needed
+
+        Sends concurrent HEAD requests so the TCP and TLS handshakes are
+        done and the connections wait in the pool for the first calls.
+
+        The requests wait for the rate limiter like public calls, so
+        warming up never spends more than the burst at once.
+
+        :param connections: connections to open, defaults to
+            WARM_UP_CONNECTIONS, or fewer when the connection limits are
+            lower
+        :returns: number of connections that answered
+        """
+        if connections is None:
+            connections = min(
+                WARM_UP_CONNECTIONS,
+                self.connector_options['limit_per_host']
+                or self.connector_options['limit']
+            )
+
+        async def connect():
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(PRIORITY_PUBLIC)
+            async with self.session.head(self.base_url) as response:
+                await response.release()
+
+        results = await asyncio.gather(
+            *(connect() for _ in range(connections)), return_exceptions=True
+        )
+        return sum(1 for result in results if result is None)
+
+    async def _request(self, url, payload=None):
+        """async HTTP GET request returning the decoded json"""
+
+        cache_key = self._cache_key(url)
+        if cache_key is not None:
+            cached = self.cache.get(*cache_key)
+            if cached is not None:
+                return cached
+
+        if self.coalesce and payload is None and not self._signed(url):
+            json_response = await self._coalesced(url)
+        else:
+            json_response = await self._fetch_with_retry(url, payload)
+
+        if cache_key is not None and json_response['success']:
+            self.cache.set(*cache_key, json_response)
+        return json_response
+
+    async def _coalesced(self, url):
+        """Fetch url, sharing the request with concurrent identical calls
+
+        The request runs in its own task so a cancelled caller does not
+        cancel it for the others.
+        """
+        key = self._unsigned_url(url)
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_with_retry(url))
+            self._in_flight[key] = task
+
+            def done(task):
+                del self._in_flight[key]
+                if not task.cancelled():
+                    # Mark the exception retrieved if every caller left
+                    task.exception()
+
+            task.add_done_callback(done)
+
+        return await asyncio.shield(task)
+
+    async def _fetch_with_retry(self, url, payload=None):
+        """Fetch url, sending it again after transient errors as far as
+        the retry policy allows"""
+        attempt = 0
+        while True:
+            try:
+                json_response = await self._fetch(url, payload)
+            except ResponseError as e:
+                delay = self._retry_delay(url, attempt, error=e)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(url, attempt, data=json_response)
+                if delay is None:
+                    return json_response
 
-    async def _get(self, url, payload=None):
-        """async HTTP GET request"""
+            await asyncio.sleep(delay)
+            url = self._renew_nonce(url)
+            attempt += 1
+
+    async def _fetch(self, url, payload=None):
+        """Send the request and decode the response"""
+
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(self._priority(url))
 
         headers = {'apisign': self._sign_url(url)}
+        start = perf_counter()
         try:
             async with self.session.get(
                 url, json=payload, headers=headers
             ) as response:
+                ttfb = perf_counter() - start
                 if response.status != requests.codes.ok:
-                    raise ResponseError(f'{url} {response.status}')
-
-                json_response = await response.json()
+                    raise HTTPStatusError(
+                        f'{url} {response.status}', response.status
+                    )
 
-            return self._parse_response(json_response)
+                body = await response.read()
+                read = perf_counter() - start - ttfb
 
         except aiohttp.client_exceptions.ClientOSError as e:
             # Catches Connection reset by peer and possibly others
@@ -44,94 +231,411 @@ class BittrexAsyncSession(BittrexBaseSession):
         except aiohttp.client_exceptions.ServerDisconnectedError as e:
             # Catched Server Disconnected errors
             raise ResponseError(f'{url}: ServerDisconnectedError {e}')
-        except TimeoutError as e:
+        except (TimeoutError, asyncio.TimeoutError) as e:
             # Timeout errors
             raise ResponseError(f'{url}: TimeoutError {e}')
+        except aiohttp.ClientError as e:
+            # Any other failure to connect or to read the response
+            raise ResponseError(f'{url}: {type(e).__name__} {e}')
 
-    async def get_markets(self, market_name=None):
-        """Added our own get single market option"""
-        url = self._get_markets()
-        markets = await self._get(url)
-
-        if market_name is not None:
-            for market in markets:
-                if market_name == market.market_name:
-                    break
-            else:
-                raise RequestError(f'Could not find {market_name}')
+        return self._decode(url, body, ttfb, read)
 
-            return market
-        else:
-            return markets
+    async def _get(self, url, payload=None, record=None):
+        """async HTTP GET request"""
+        json_response = await self._request(url, payload)
+        return self._parse(url, json_response, record)
 
-    async def get_market_summaries(self, market_name=None):
-        url = self._get_market_summaries(market_name)
-        return await self._get(url)
+    async def _stream(self, url, record=None, chunk_size=65536):
+        """async HTTP GET request yielding result items while the body
+        arrives"""
 
-    async def get_market_history(self, market_name):
-        url = self._get_market_history(market_name)
-        return await self._get(url)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(self._priority(url))
 
-    async def get_currencies(self):
-        url = self._get_currencies()
-        return await self._get(url)
+        headers = {'apisign': self._sign_url(url)}
+        try:
+            async with self.session.get(url, headers=headers) as response:
+                if response.status != requests.codes.ok:
+                    raise HTTPStatusError(
+                        f'{url} {response.status}', response.status
+                    )
 
-    async def get_ticker(self, market_name):
-        url = self._get_ticker(market_name)
-        return await self._get(url)
+                from_dict = self._result_class(record).from_dict
+                parser = ResultStream()
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    for row in parser.feed(chunk):
+                        yield from_dict(row)
 
-    async def get_order_book(self, market_name, order_type='both'):
-        url = self._get_order_book(market_name, order_type)
-        return await self._get(url)
+                for row in parser.close():
+                    yield from_dict(row)
 
-    async def buy_limit(self, market_name, quantity, rate):
-        url = self._buy_limit(market_name, quantity, rate)
-        return await self._get(url)
+        except aiohttp.client_exceptions.ClientOSError as e:
+            # Catches Connection reset by peer and possibly others
+            raise ResponseError(f'{url}: ClientOSError {e}')
+        except aiohttp.client_exceptions.ServerDisconnectedError as e:
+            # Catched Server Disconnected errors
+            raise ResponseError(f'{url}: ServerDisconnectedError {e}')
+        except (TimeoutError, asyncio.TimeoutError) as e:
+            # Timeout errors
+            raise ResponseError(f'{url}: TimeoutError {e}')
+        except aiohttp.ClientError as e:
+            # Any other failure to connect or to read the response
+            raise ResponseError(f'{url}: {type(e).__name__} {e}')
 
-    async def sell_limit(self, market_name, quantity, rate):
-        url = self._sell_limit(market_name, quantity, rate)
-        return await self._get(url)
+    async def get_markets(self, market_name=None):
+        """Added our own get single market option
 
-    async def cancel_order(self, uuid):
-        url = self._cancel_order(uuid)
-        return await self._get(url)
+        A single market is looked up in the market registry, which is
+        only reloaded when it is stale.
+        """
+        if market_name is not None:
+            if self.registry.stale:
+                await self.load_registry()
+            return self.registry.get(market_name)
 
-    async def get_open_orders(self, market_name=None):
-        url = self._get_open_orders(market_name)
-        return await self._get(url)
+        url = self._get_markets()
+        return await self._get(url, record=Market)
+
+    async def load_registry(self):
+        """Retrieve all markets and currencies into the market registry"""
+        markets, currencies = await asyncio.gather(
+            self._get(self._get_markets(), record=Market),
+            self._get(self._get_currencies(), record=Currency)
+        )
+        self.registry.load(markets, currencies)
+
+    def start_registry_refresh(self, interval=None):
+        """Reload the market registry in a background task
+
+        :param interval: seconds between reloads, defaults to the
+            registry ttl
+        """
+        if self._registry_refresh is not None:
+            return
+
+        interval = interval or self.registry.ttl
+
+        async def refresh():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.load_registry()
+                except (RequestError, ResponseError, ValueError):
+                    # ValueError is raised on a body that fails to decode.
+                    # Keep the last registry, get_markets reloads it once
+                    # it goes stale
+                    pass
+
+        self._registry_refresh = asyncio.ensure_future(refresh())
+
+    async def get_market_history(self, market_name, as_columns=False):
+        """Retrieve the latest trades for given market_name
+
+        :param as_columns: return a dict of numpy arrays instead of items
+        """
+        url = self._get_market_history(market_name)
 
-    async def get_order(self, uuid):
-        url = self._get_order(uuid)
-        return await self._get(url)
+        if as_columns:
+            json_response = await self._request(url)
+            return self._parse_columns(json_response, TRADE_COLUMNS)
+        return await self._get(url, record=Trade)
 
-    async def get_order_history(self, market_name=None):
-        url = self._get_order_history(market_name)
-        return await self._get(url)
+    async def get_order_book(self, market_name, order_type='both',
+                             as_book=False):
+        """Retrieve orderbook of given market
 
-    async def get_balances(self, currency=None):
-        url = self._get_balances(currency)
-        return await self._get(url)
+        :param as_book: return a LocalOrderBook of both sides instead of
+            items
+        """
+        if as_book:
+            url = self._get_order_book(market_name, 'both')
+            json_response = await self._request(url)
+            return self._parse_order_book(json_response, market_name)
 
-    async def get_deposit_address(self, currency):
-        url = self._get_deposit_address(currency)
-        return await self._get(url)
+        url = self._get_order_book(market_name, order_type)
+        record = OrderBook if order_type == 'both' else OrderBookEntry
+        return await self._get(url, record=record)
 
-    async def withdraw(self, currency, quantity, address, payment_id=None):
-        url = self._withdraw(currency, quantity, address, payment_id)
-        return await self._get(url)
+    async def update_order_book(self, book):
+        """Refresh a LocalOrderBook from a new snapshot of its market
 
-    async def get_withdrawal_history(self, currency=None):
-        url = self._get_withdrawal_history(currency)
-        return await self._get(url)
+        The book is updated in place with only the levels that changed.
+        """
+        url = self._get_order_book(book.market_name, 'both')
+        json_response = await self._request(url)
+        return self._parse_order_book(json_response, book.market_name, book)
 
-    async def get_deposit_history(self, currency=None):
-        url = self._get_deposit_history(currency)
-        return await self._get(url)
+    async def get_candles(self, market_name, tick_interval,
+                          as_columns=False):
+        """Retrieve candles for given market_name
 
-    async def get_candles(self, market_name, tick_interval):
+        :param as_columns: return a dict of numpy arrays instead of items
+        """
         url = self._get_candles(market_name, tick_interval)
-        return await self._get(url)
 
-    async def get_latest_candle(self, market_name, tick_interval):
+        if as_columns:
+            json_response = await self._request(url)
+            return self._parse_columns(json_response, CANDLE_COLUMNS)
+        return await self._get(url, record=Candle)
+
+    async def get_latest_candle(self, market_name, tick_interval,
+                                as_columns=False):
         url = self._get_latest_candle(market_name, tick_interval)
-        return await self._get(url)
+
+        if as_columns:
+            json_response = await self._request(url)
+            return self._parse_columns(json_response, CANDLE_COLUMNS)
+        return await self._get(url, record=Candle)
+
+    async def update_candles(self, store):
+        """Bring a CandleStore up to date
+
+        An empty store gets the full history, after that only the latest
+        candle is retrieved. When candles went missing in between, the
+        history is retrieved again but only the missing window, starting
+        at the newest stored candle, is merged.
+
+        Only the latest candle is replaced on every update. A candle that
+        closed between two updates keeps the values last observed for it,
+        trades in its final moments are missing, unless a gap made the
+        update retrieve the history again.
+        """
+        market_name, tick_interval = store.market_name, store.tick_interval
+
+        if not len(store):
+            store.extend(await self.get_candles(
+                market_name, tick_interval, as_columns=True
+            ))
+            return store
+
+        latest = await self.get_latest_candle(
+            market_name, tick_interval, as_columns=True
+        )
+
+        gap = store.gap(latest)
+        if gap is not None:
+            history = await self.get_candles(
+                market_name, tick_interval, as_columns=True
+            )
+            store.extend(history, *gap)
+
+        store.extend(latest)
+        return store
+
+    async def update_archive(self, archive):
+        """Append new candles or trades to a CandleArchive or TradeArchive
+
+        :returns: number of rows appended
+        """
+        method, args = archive.source
+        columns = await getattr(self, method)(*args, as_columns=True)
+        return archive.append(columns)
+
+    async def fan_out(self, method, markets, *args, concurrency=10, **kwargs):
+        """Call method for every market, at most concurrency at a time
+
+        Yields (market, result) tuples as the calls complete. A market that
+        fails yields the raised exception as its result instead of
+        cancelling the others.
+
+        :param method: per market coroutine method, eg. self.get_ticker
+        :param markets: iterable of market names
+        :param concurrency: maximum number of calls in flight
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(market):
+            async with semaphore:
+                try:
+                    return market, await method(market, *args, **kwargs)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    return market, e
+
+        tasks = [asyncio.ensure_future(call(market)) for market in markets]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def map_markets(self, method, markets, *args, concurrency=10,
+                          **kwargs):
+        """Call method for every market and return a dict of results
+
+        The dict follows the order of markets; failed markets map to the
+        raised exception. See fan_out for the parameters.
+        """
+        markets = list(markets)
+        results = {}
+        async for market, result in self.fan_out(
+            method, markets, *args, concurrency=concurrency, **kwargs
+        ):
+            results[market] = result
+
+        return {market: results[market] for market in markets}
+
+    async def get_tickers(self, markets, concurrency=10):
+        return await self.map_markets(
+            self.get_ticker, markets, concurrency=concurrency
+        )
+
+    async def get_order_books(self, markets, order_type='both',
+                              concurrency=10):
+        return await self.map_markets(
+            self.get_order_book, markets, order_type, concurrency=concurrency
+        )
+
+    async def get_candles_many(self, markets, tick_interval, concurrency=10,
+                               as_columns=False):
+        return await self.map_markets(
+            self.get_candles, markets, tick_interval,
+            concurrency=concurrency, as_columns=as_columns
+        )
+
+    async def _place_order(self, order_type, market_name, quantity, rate):
+        if order_type == 'buy':
+            return await self.buy_limit(market_name, quantity, rate)
+        elif order_type == 'sell':
+            return await self.sell_limit(market_name, quantity, rate)
+        raise RequestError(f'Unknown order type {order_type}')
+
+    async def place_orders(self, orders, concurrency=10):
+        """Place limit orders concurrently
+
+        Placing is never retried. Orders whose request failed without a
+        clear answer are looked up among the open orders of their market
+        afterwards, ignoring the orders that were already open before the
+        batch. Those are retrieved first, so a batch starts with one
+        getopenorders request.
+
+        :param orders: (order_type, market_name, quantity, rate) tuples,
+            order_type being buy or sell
+        :returns: list with the buy_limit/sell_limit result or the raised
+            exception of every order
+        """
+        orders = list(orders)
+        known = {order.order_uuid for order in await self.get_open_orders()}
+
+        async def place(index):
+            return await self._place_order(*orders[index])
+
+        results = await self.map_markets(
+            place, range(len(orders)), concurrency=concurrency
+        )
+        report = [results[index] for index in range(len(orders))]
+
+        markets = {
+            orders[index][1] for index in self._ambiguous_orders(report)
+        }
+        if markets:
+            open_orders = await self.map_markets(
+                self.get_open_orders, markets, concurrency=concurrency
+            )
+            open_orders = {
+                market: orders for market, orders in open_orders.items()
+                if not isinstance(orders, Exception)
+            }
+            self._reconcile_orders(orders, report, open_orders, known)
+        return report
+
+    async def _cancel_order_safely(self, uuid, attempts=3):
+        """Cancel an order, looking at its state before a retry so a cancel
+        without a clear answer is not sent twice"""
+        for attempt in range(attempts):
+            try:
+                await self.cancel_order(uuid)
+                return True
+            except RequestError as e:
+                if str(e) == 'ORDER_NOT_OPEN':
+                    return True
+                raise
+            except ResponseError as e:
+                error = e
+
+            if self._order_settled(await self.get_order(uuid)):
+                return True
+        raise error
+
+    async def cancel_orders(self, uuids, concurrency=10, attempts=3):
+        """Cancel orders concurrently
+
+        :param uuids: uuids of the orders to cancel, each is cancelled
+            once however often it is listed
+        :param attempts: cancel requests per order at most
+        :returns: dict of uuid to True once the order is cancelled or no
+            longer open, or the raised exception
+        """
+        if attempts < 1:
+            raise ValueError('attempts must be at least 1')
+
+        return await self.map_markets(
+            self._cancel_order_safely, list(dict.fromkeys(uuids)), attempts,
+            concurrency=concurrency
+        )
+
+    async def cancel_all(self, market_name=None, concurrency=10):
+        """Cancel all open orders, optionally only those of market_name"""
+        open_orders = await self.get_open_orders(market_name)
+        return await self.cancel_orders(
+            [order.order_uuid for order in open_orders],
+            concurrency=concurrency
+        )
+
+    async def get_orders(self, uuids, concurrency=10):
+        """Retrieve orders concurrently, returns a dict of uuid to order or
+        the raised exception"""
+        return await self.map_markets(
+            self.get_order, uuids, concurrency=concurrency
+        )
+
+    async def poll_market_summaries(self, min_interval=1.0,
+                                    max_interval=30.0, poller=None):
+        """Poll the market summaries, yielding only what changed
+
+        The first poll reports every market as added. Polls without
+        changes yield nothing, see SummaryPoller for the diffing and the
+        poll interval.
+
+        :param poller: SummaryPoller to continue from, eg. after an error
+        :returns: async iterator of MarketChanges
+        """
+        if poller is None:
+            poller = SummaryPoller(min_interval, max_interval)
+
+        url = self._get_market_summaries()
+        from_dict = self._result_class(MarketSummary).from_dict
+        while True:
+            json_response = await self._request(url)
+            if json_response['success'] is False:
+                raise RequestError(json_response['message'])
+
+            changes = poller.diff(json_response['result'], from_dict)
+            if changes:
+                yield changes
+            await asyncio.sleep(poller.next_interval(changes))
+
+    def iter_market_history(self, market_name):
+        """Async iterator over the latest trades of market_name while they
+        are received"""
+        url = self._get_market_history(market_name)
+        return self._stream(url, record=Trade)
+
+    def iter_order_book(self, market_name, order_type='buy'):
+        """Async iterator over the order book entries of market_name while
+        they are received. order_type both yields a single OrderBook once
+        the full response is in."""
+        url = self._get_order_book(market_name, order_type)
+        record = OrderBook if order_type == 'both' else OrderBookEntry
+        return self._stream(url, record=record)
+
+    def iter_candles(self, market_name, tick_interval):
+        """Async iterator over the candles of market_name while they are
+        received"""
+        url = self._get_candles(market_name, tick_interval)
+        return self._stream(url, record=Candle)
+
+
+add_endpoint_methods(BittrexAsyncSession, async_method)
@@ -1,18 +1,39 @@
 from urllib.parse import urlencode
 import json
-from .response import Response
-from .exceptions import RequestError, ResponseError
+from .response import Response, LazyResponse
+from .columns import to_columns
+from .decoders import get_decoder
+from .cache import ResponseCache
+from .retry import RetryPolicy
+from .registry import MarketRegistry
+from .orderbook import LocalOrderBook
+from .nonce import default_nonce_generator
+from .ratelimit import RateLimiter, PRIORITY_PUBLIC
+from .endpoints import (
+    ENDPOINTS_BY_PATH, Template, url_builder, add_endpoint_methods
+)
+from .exceptions import RequestError, ResponseError, AmbiguousOrderError
+from .instrumentation import Instrumentation
 import hashlib
 import hmac
-from time import time
+from time import perf_counter
 
 
 __version__ = 'v0.0.9'
 
+RESULT_MODES = ('response', 'records', 'lazy')
+
+ORDER_TYPES = {'buy': 'LIMIT_BUY', 'sell': 'LIMIT_SELL'}
+
 
 class BittrexBaseSession:
+    rate_limiter_class = RateLimiter
+
     def __init__(self, key, secret, host='bittrex.com',
-                 version='v1.1', version_v2='v2.0', loop=None):
+                 version='v1.1', version_v2='v2.0', loop=None,
+                 result_mode='response', decoder=None, rate_limit=None,
+                 burst=None, cache=None, registry_ttl=300,
+                 nonce_generator=None, retry=None, instrumentation=None):
         """Initialise session
 
         :param key:
@@ -21,336 +42,389 @@ class BittrexBaseSession:
         :param version:
         :param version_v2:
         :param loop: asyncio loop for async session
+        :param result_mode: response returns generic Response items,
+            records returns slotted per endpoint records and lazy returns
+            Response items that convert fields on first access
+        :param decoder: json decoder for response bodies, see get_decoder.
+            Defaults to the fastest one installed
+        :param rate_limit: maximum requests per second, eg. 0.5 for one
+            request every two seconds, None disables client side rate
+            limiting
+        :param burst: requests allowed back to back, defaults to
+            rate_limit and is at least 1
+        :param cache: cache public responses, True uses the default
+            per endpoint policies, a dict sets (ttl, maxsize) per endpoint
+            and a ResponseCache instance can be shared between sessions
+        :param registry_ttl: seconds before get_markets(market_name)
+            reloads the market registry
+        :param nonce_generator: callable returning strictly increasing
+            nonces, defaults to one shared by all sessions of the process.
+            Use a FileNonceGenerator when processes share an api key
+        :param retry: retry idempotent calls on transient errors, True
+            uses the default policy, a dict sets (attempts, base_delay,
+            max_delay) per endpoint and a RetryPolicy instance is used
+            as is
+        :param instrumentation: report per endpoint timings and sizes,
+            True keeps them in a HistogramSink, a list of sinks reports
+            to those and an Instrumentation instance is used as is
         """
+        if result_mode not in RESULT_MODES:
+            raise ValueError(f'Unknown result_mode {result_mode}')
+
+        self.result_mode = result_mode
+        self.decoder = get_decoder(decoder)
+        self.rate_limiter = None
+        if rate_limit is not None:
+            if rate_limit <= 0:
+                raise ValueError(
+                    f'rate_limit must be above 0, not {rate_limit}'
+                )
+            self.rate_limiter = self.rate_limiter_class(rate_limit, burst)
+
+        if cache is True:
+            cache = ResponseCache()
+        elif isinstance(cache, dict):
+            cache = ResponseCache(cache)
+        self.cache = cache or None
+
+        if retry is True:
+            retry = RetryPolicy()
+        elif isinstance(retry, dict):
+            retry = RetryPolicy(retry)
+        self.retry = retry or None
+
+        if instrumentation is True:
+            instrumentation = Instrumentation()
+        elif isinstance(instrumentation, (list, tuple)):
+            instrumentation = Instrumentation(*instrumentation)
+        self.instrumentation = instrumentation or None
+        self.registry = MarketRegistry(registry_ttl)
+        self.nonce_generator = nonce_generator or default_nonce_generator
         self.key = key
         self.secret = secret
-        self.host = host
-        self.version = version
-        self.version_v2 = version_v2
+        self._host = host
+        self._version = version
+        self._version_v2 = version_v2
+        self._update_base_urls()
+
+    def _update_base_urls(self):
+        self._base_url = f'https://{self._host}/api/{self._version}/'
+        self._base_url_v2 = f'https://{self._host}/Api/{self._version_v2}/'
+        self._templates = {}
 
     @property
-    def base_url(self):
-        return f'https://{self.host}/api/{self.version}/'
+    def key(self):
+        return self._key
+
+    @key.setter
+    def key(self, key):
+        self._key = key
+        # apikey is the first parameter of every signed url
+        self._key_parameter = urlencode({'apikey': key})
+        self._templates = {}
 
     @property
-    def base_url_v2(self):
-        return f'https://{self.host}/Api/{self.version_v2}/'
+    def secret(self):
+        return self._secret
+
+    @secret.setter
+    def secret(self, secret):
+        self._secret = secret
+        # Pre-keyed hmac state, copied for every url that gets signed
+        self._hmac = hmac.new(secret.encode(), digestmod=hashlib.sha512)
 
     @property
-    def nonce(self):
-        """Returns the current nonce for apikey signing"""
-        return f"{int(time() * 1000)}"
+    def host(self):
+        return self._host
 
-    def _sign_url(self, url):
-        """Signs a url with hmac"""
-        return hmac.new(
-            self.secret.encode(),
-            url.encode(),
-            hashlib.sha512
-        ).hexdigest()
+    @host.setter
+    def host(self, host):
+        self._host = host
+        self._update_base_urls()
+
+    @property
+    def version(self):
+        return self._version
 
-    def _url(self, method, parameters=None):
-        """Compile url"""
-        url = f'{self.base_url}{method}'
+    @version.setter
+    def version(self, version):
+        self._version = version
+        self._update_base_urls()
+
+    @property
+    def version_v2(self):
+        return self._version_v2
 
-        if parameters is not None:
-            encoded_params = urlencode(parameters)
-            url += f'?{encoded_params}'
+    @version_v2.setter
+    def version_v2(self, version_v2):
+        self._version_v2 = version_v2
+        self._update_base_urls()
 
-        return url
+    @property
+    def base_url(self):
+        return self._base_url
 
-    def _url_v2(self, method, parameters=None):
-        """Compile v2 api url"""
-        url = f'{self.base_url_v2}{method}'
+    @property
+    def base_url_v2(self):
+        return self._base_url_v2
 
-        if parameters is not None:
-            encoded_params = urlencode(parameters)
-            url += f'?{encoded_params}'
+    @property
+    def nonce(self):
+        """Returns the next nonce for apikey signing"""
+        return f"{self.nonce_generator()}"
 
-        return url
+    def _sign_url(self, url):
+        """Signs a url with hmac"""
+        signer = self._hmac.copy()
+        signer.update(url.encode())
+        return signer.hexdigest()
+
+    def _build_url(self, endpoint, args, kwargs):
+        """Compile the url of an endpoint call from its template"""
+        endpoint, values = endpoint.bind(args, kwargs)
+
+        template = self._templates.get(endpoint.path)
+        if template is None:
+            if endpoint.version == 2:
+                base_url = self._base_url_v2
+            else:
+                base_url = self._base_url
+            template = Template(endpoint, base_url, self._key_parameter)
+            self._templates[endpoint.path] = template
+
+        if template.signed:
+            return template.url(values, self.nonce)
+        return template.url(values)
+
+    def _endpoint(self, url):
+        """Returns the api method of a compiled url, eg. market/buylimit"""
+        path = url.split('?', 1)[0]
+
+        for base_url in (self.base_url, self.base_url_v2):
+            if path.startswith(base_url):
+                return path[len(base_url):]
+        return path
+
+    def _priority(self, url):
+        """Returns the rate limiter lane for a compiled url"""
+        endpoint = self._endpoint(url)
+
+        try:
+            return ENDPOINTS_BY_PATH[endpoint].priority
+        except KeyError:
+            return PRIORITY_PUBLIC
+
+    def _signed(self, url):
+        """True when url carries the apikey and nonce, or its endpoint is
+        not known"""
+        endpoint = ENDPOINTS_BY_PATH.get(self._endpoint(url))
+        return endpoint is None or endpoint.signed
+
+    def _retry_delay(self, url, attempt, error=None, data=None):
+        """Returns the seconds to wait before sending url again, or None
+        when the failed attempt is final"""
+        if self.retry is None:
+            return None
+        return self.retry.delay(self._endpoint(url), attempt, error, data)
+
+    def _renew_nonce(self, url):
+        """Returns url with a fresh nonce, so a retried signed call is
+        not refused for reusing one"""
+        prefix = f'?{self._key_parameter}&nonce='
+        head, found, tail = url.partition(prefix)
+        if not found:
+            return url
+
+        _, _, parameters = tail.partition('&')
+        url = f'{head}{prefix}{self.nonce}'
+        return f'{url}&{parameters}' if parameters else url
+
+    def _unsigned_url(self, url):
+        """Returns url without the apikey and nonce parameters"""
+        if '?' not in url:
+            return url
+
+        path, query = url.split('?', 1)
+        query = '&'.join(
+            parameter for parameter in query.split('&')
+            if not parameter.startswith(('apikey=', 'nonce='))
+        )
+        return f'{path}?{query}' if query else path
+
+    def _cache_key(self, url):
+        """Returns (endpoint, url) to cache url under, or None when the
+        response of url must not be cached"""
+        if self.cache is None:
+            return None
+
+        endpoint = self._endpoint(url)
+        if endpoint not in self.cache.policies:
+            return None
+
+        # Signed calls are never cached, whatever the policies say
+        if self._signed(url):
+            return None
+
+        return endpoint, self._unsigned_url(url)
 
     def _get(self):
         """Ensure to implement the Async and Sync version"""
         raise NotImplemented
 
-    def _parse_response(self, data):
-        """parse the received json response"""
+    def _result_class(self, record=None):
+        """Returns the class result items are built with
+
+        :param record: Record class used when result_mode is records
+        """
+        if self.result_mode == 'lazy':
+            return LazyResponse
+        elif record is None or self.result_mode == 'response':
+            return Response
+        return record
+
+    def _decode(self, url, body, ttfb=None, read=None):
+        """Decode a response body, reporting the network and decode
+        timings when instrumented"""
+        if self.instrumentation is None:
+            return self.decoder(body)
+
+        start = perf_counter()
+        data = self.decoder(body)
+        self.instrumentation.observe(self._endpoint(url), {
+            'ttfb': ttfb,
+            'read': read,
+            'decode': perf_counter() - start,
+            'bytes': len(body),
+        })
+        return data
+
+    def _parse(self, url, data, record=None):
+        """_parse_response, reporting the parse time and number of rows
+        when instrumented"""
+        if self.instrumentation is None:
+            return self._parse_response(data, record)
+
+        start = perf_counter()
+        result = self._parse_response(data, record)
+        elapsed = perf_counter() - start
+
+        if isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = 0 if result is None else 1
+        self.instrumentation.observe(
+            self._endpoint(url), {'parse': elapsed, 'rows': rows}
+        )
+        return result
+
+    def _parse_response(self, data, record=None):
+        """parse the received json response
+
+        :param data: decoded json response
+        :param record: Record class used when result_mode is records
+        """
 
         if data['success'] is False:
             raise RequestError(data['message'])
 
+        record = self._result_class(record)
+
         if isinstance(data['result'], list):
-            return [Response(**result) for result in data['result']]
+            from_dict = record.from_dict
+            return [from_dict(result) for result in data['result']]
         elif isinstance(data['result'], dict):
-            return Response(**data['result'])
+            return record.from_dict(data['result'])
         elif data['result'] is None:
             # for instance in cancel order
             pass
         else:
             raise ResponseError(f"Parsing failed: {data}")
 
-    def _get_markets(self):
-        """Retrieve public markets"""
-        return self._url('public/getmarkets')
+    def _parse_columns(self, data, columns):
+        """parse the received json response into numpy columns
 
-    def _get_market_summaries(self, market_name=None):
-        """Retrieve last 24h public active market summaries
-
-        :param market_name: If provided, return summary of specific market
-        """
-        if market_name is None:
-            return self._url('public/getmarketsummaries')
-        else:
-            params = {'market': market_name}
-            return self._url('public/getmarketsummary', params)
-
-    def _get_market_history(self, market_name):
-        """Retrieve the latest trades that occured for given market
-
-        :param market_name: Name of the market
+        :param data: decoded json response
+        :param columns: column spec, eg. CANDLE_COLUMNS
         """
-        return self._url('public/getmarkethistory', {'market': market_name})
 
-    def _get_currencies(self):
-        """Retrieve public currencies"""
-        return self._url('public/getcurrencies')
-
-    def _get_ticker(self, market_name):
-        """Retrieve current ticker for given market_name"""
-        return self._url('public/getticker', {'market': market_name})
-
-    def _get_order_book(self, market_name, order_type='both'):
-        """Retrieve orderbook of given market
-
-        :param market_name: short name of Market
-        :param order_type: buy, sell or both
-        """
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce,
-            'market': market_name,
-            'type': order_type
-        }
-        return self._url('public/getorderbook', params)
-
-    def _buy_limit(self, market_name, quantity, rate):
-        """Used to place a buy order in a specific market. Use buylimit to place
-        limit orders.
-
-        :param market_name: Name of the market
-        :param quantity (float): amount to purchase
-        :param rate (float): rate at which to place the order
-        """
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce,
-            'market': market_name,
-            'quantity': quantity,
-            'rate': rate
-        }
-        return self._url('market/buylimit', params)
-
-    def _sell_limit(self, market_name, quantity, rate):
-        """Used to place a sell order in a specific market. Use selllimit to place
-        limit orders.
-
-        :param market_name: Name of the market
-        :param quantity (float): amount to purchase
-        :param rate (float): rate at which to place the order
-        """
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce,
-            'market': market_name,
-            'quantity': quantity,
-            'rate': rate
-        }
-        return self._url('market/selllimit', params)
-
-    def _cancel_order(self, uuid):
-        """Used to cancel a buy or sell order."""
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce,
-            'uuid': uuid
-        }
-        return self._url('market/cancel', params)
-
-    def _get_open_orders(self, market_name=None):
-        """Get all orders that you currently have opened.
-
-        :param market_name: Optional limit to specific market
-        """
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce
-        }
-
-        if market_name is not None:
-            params['market'] = market_name
-
-        return self._url('market/getopenorders', params)
-
-    def _get_order(self, uuid):
-        """Get single order by uuid
-
-        :param uuid: uuid of specific order
-        """
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce,
-            'uuid': uuid
-        }
-        return self._url('account/getorder', params)
-
-    def _get_order_history(self, market_name=None):
-        """Retrieve your order history"""
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce
-        }
-        if market_name is not None:
-            params['market'] = market_name
-
-        return self._url('account/getorderhistory', params)
-
-    def _get_balances(self, currency=None):
-        """Used to retrieve all balances from your account
-
-        :param currency: optional limit to specific currency, eg. 'LTC'
-        """
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce
-        }
-
-        if currency is not None:
-            params['currency'] = currency
-            return self._url('account/getbalance', params)
-
-        return self._url('account/getbalances', params)
-
-    def _get_deposit_address(self, currency):
-        """Used to retrieve or generate an address for a specific currency.
-        If one does not exist, the call will fail and return ADDRESS_GENERATING
-        until one is available.
-
-        :param currency: currency string literal, eg. 'BTC'
-        """
-
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce,
-            'currency': currency
-        }
-        return self._url('account/getdepositaddress', params)
-
-    def _withdraw(self, currency, quantity, address, payment_id=None):
-        """Used to withdraw funds from your account. note: please account for txfee.
-
-        :param currency: a string literal for the currency (ie. BTC)
-        :param quantity: the quantity of coins to withdraw
-        :param address: the address where to send the funds.
-
-        :param paymentid: used for CryptoNotes/BitShareX/Nxt (memo/paymentid)
-        """
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce,
-            'currency': currency,
-            'quantity': quantity,
-            'address': address
-        }
-
-        if payment_id is not None:
-            params['paymentid'] = payment_id
-
-        return self._url('account/withdraw', params)
-
-    def _get_withdrawal_history(self, currency=None):
-        """Retrieve your withdrawal history
-
-        :param currency: Optional limit on currency type, eg. 'BTC'
-        """
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce
-        }
-
-        if currency is not None:
-            params['currency'] = currency
-
-        return self._url('account/getwithdrawalhistory', params)
-
-    def _get_deposit_history(self, currency=None):
-        """Retrieve your deposit history
-
-        :param currency: Optional limit on currency type, eg. 'BTC'
-        """
-        params = {
-            'apikey': self.key,
-            'nonce': self.nonce
-        }
-        if currency is not None:
-            params['currency'] = currency
+        if data['success'] is False:
+            raise RequestError(data['message'])
 
-        return self._url('account/getdeposithistory', params)
+        if not isinstance(data['result'], list):
+            raise ResponseError(f"Parsing failed: {data}")
 
-    # NOTE: Endpoints below this point are using the beta v2 version
-    # use at your own risk..
+        return to_columns(data['result'], columns)
 
-    def _get_candles(self, market_name, tick_interval):
-        """Gets candles for given market_name
+    def _parse_order_book(self, data, market_name, book=None):
+        """parse the received getorderbook response into a LocalOrderBook
 
-        :param market_name: Name of the market
-        :param tick_interval: one_min, five_min, thirty_min, hour or day
+        :param book: existing LocalOrderBook to update instead of
+            creating one
         """
-        params = {
-            'marketName': market_name
-        }
-
-        if tick_interval == 'one_min':
-            params['tickInterval'] = 'oneMin'
-        elif tick_interval == 'five_min':
-            params['tickInterval'] = 'fiveMin'
-        elif tick_interval == 'thirty_min':
-            params['tickInterval'] = 'thirtyMin'
-        elif tick_interval == 'hour':
-            params['tickInterval'] = 'hour'
-        elif tick_interval == 'day':
-            params['tickInterval'] = 'day'
-        else:
-            raise RequestError('tickInterval')
 
-        return self._url_v2('pub/market/GetTicks', params)
+        if data['success'] is False:
+            raise RequestError(data['message'])
 
-    def _get_latest_candle(self, market_name, tick_interval):
-        """Gets latest candle for given market_name
+        if not isinstance(data['result'], dict):
+            raise ResponseError(f"Parsing failed: {data}")
 
-        :param market_name: Name of the market
-        :param tick_interval: one_min, five_min, thirty_min, hour or day
+        if book is None:
+            return LocalOrderBook.from_result(data['result'], market_name)
+
+        book.update(data['result'])
+        return book
+
+    @staticmethod
+    def _order_settled(order):
+        """True when a cancel is no longer needed for order"""
+        return not order.is_open or bool(order.cancel_initiated)
+
+    @staticmethod
+    def _ambiguous_orders(report):
+        """Returns the indexes of orders whose placement may or may not
+        have reached bittrex"""
+        return [
+            index for index, result in enumerate(report)
+            if isinstance(result, ResponseError)
+        ]
+
+    def _reconcile_orders(self, orders, report, open_orders, known):
+        """Resolve ambiguous placements against the open orders
+
+        An ambiguous order matching an open order that was not open
+        before the batch and nobody else in the batch claimed is reported
+        as placed, the others get an AmbiguousOrderError.
+
+        :param orders: (order_type, market_name, quantity, rate) tuples
+        :param report: results of placing orders, updated in place
+        :param open_orders: dict of market_name to its open orders
+        :param known: uuids of the orders open before the batch
         """
-        params = {
-            'marketName': market_name
-        }
-
-        if tick_interval == 'one_min':
-            params['tickInterval'] = 'oneMin'
-        elif tick_interval == 'five_min':
-            params['tickInterval'] = 'fiveMin'
-        elif tick_interval == 'thirty_min':
-            params['tickInterval'] = 'thirtyMin'
-        elif tick_interval == 'hour':
-            params['tickInterval'] = 'hour'
-        elif tick_interval == 'day':
-            params['tickInterval'] = 'day'
-        else:
-            raise RequestError('tickInterval')
-
-        return self._url_v2('pub/market/GetLatestTick', params)
+        claimed = set(known)
+        claimed.update(
+            result.uuid for result in report
+            if isinstance(result, Response) and hasattr(result, 'uuid')
+        )
+
+        for index in self._ambiguous_orders(report):
+            order_type, market_name, quantity, rate = orders[index]
+            for order in open_orders.get(market_name, ()):
+                if (order.order_uuid not in claimed
+                        and order.order_type == ORDER_TYPES[order_type]
+                        and order.quantity == quantity
+                        and order.limit == rate):
+                    claimed.add(order.order_uuid)
+                    report[index] = Response(uuid=order.order_uuid)
+                    break
+            else:
+                report[index] = AmbiguousOrderError(
+                    f'{order_type} {quantity} {market_name} at {rate}: '
+                    f'{report[index]}, not found among the open orders'
+                )
+        return report
 
     @classmethod
-    def load_from_file(cls, filename, loop=None):
+    def load_from_file(cls, filename, loop=None, **kwargs):
         """Initialise class through config file"""
 
         with open(filename, 'r') as f:
@@ -360,4 +434,7 @@ class BittrexBaseSession:
         secret = config['secret']
         version = config.get('version', 'v1.1')
 
-        return cls(key, secret, version=version, loop=loop)
+        return cls(key, secret, version=version, loop=loop, **kwargs)
+
+
+add_endpoint_methods(BittrexBaseSession, url_builder, prefix='_')
@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from .endpoints import ENDPOINTS_BY_PATH
+
+# endpoint: (ttl in seconds, maximum number of cached urls)
+DEFAULT_POLICIES = {
+    path: endpoint.cache
+    for path, endpoint in ENDPOINTS_BY_PATH.items()
+    if endpoint.cache is not None
+}
+
+
+class CachePolicy:
+    """Time to live and LRU size of a single endpoint"""
+
+    def __init__(self, ttl, maxsize=128):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+class ResponseCache:
+    """TTL + LRU cache of decoded responses, keyed by request url
+
+    Only public endpoints are ever looked up, see
+    BittrexBaseSession._cache_key.
+
+    :param policies: dict of endpoint to (ttl, maxsize), endpoints not in
+        here are not cached. Defaults to DEFAULT_POLICIES
+    """
+
+    def __init__(self, policies=None):
+        if policies is None:
+            policies = DEFAULT_POLICIES
+
+        self.policies = {
+            endpoint: CachePolicy(*policy)
+            for endpoint, policy in policies.items()
+        }
+        self._lock = threading.Lock()
+
+    def get(self, endpoint, url):
+        """Returns the cached response or None"""
+        policy = self.policies[endpoint]
+        with self._lock:
+            try:
+                expires, data = policy.entries[url]
+            except KeyError:
+                policy.misses += 1
+                return None
+
+            if expires < monotonic():
+                del policy.entries[url]
+                policy.misses += 1
+                return None
+
+            policy.entries.move_to_end(url)
+            policy.hits += 1
+            return data
+
+    def set(self, endpoint, url, data):
+        policy = self.policies[endpoint]
+        with self._lock:
+            policy.entries[url] = (monotonic() + policy.ttl, data)
+            policy.entries.move_to_end(url)
+
+            while len(policy.entries) > policy.maxsize:
+                policy.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            for policy in self.policies.values():
+                policy.entries.clear()
+
+    def metrics(self):
+        """Hit and miss counters per endpoint"""
+        return {
+            endpoint: {
+                'hits': policy.hits,
+                'misses': policy.misses,
+                'size': len(policy.entries),
+            }
+            for endpoint, policy in self.policies.items()
+        }
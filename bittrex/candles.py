@@ -0,0 +1,174 @@
+from .columns import numpy, CANDLE_COLUMNS
+from .exceptions import RequestError
+
+# tick interval length in milliseconds
+INTERVALS = {
+    'one_min': 60000,
+    'five_min': 300000,
+    'thirty_min': 1800000,
+    'hour': 3600000,
+    'day': 86400000,
+}
+
+
+class CandleStore:
+    """Candle history of one market and interval in growable numpy arrays
+
+    Columns are the same as get_candles(as_columns=True) returns. The
+    sessions keep a store current with update_candles, which downloads
+    the full history once and then only the latest candle.
+
+    :param market_name: Name of the market
+    :param tick_interval: one_min, five_min, thirty_min, hour or day
+    :param capacity: number of candles to preallocate, at least 1
+    """
+
+    def __init__(self, market_name, tick_interval, capacity=1024):
+        if numpy is None:
+            raise ModuleNotFoundError('numpy is required for CandleStore')
+
+        if capacity < 1:
+            raise ValueError(f'capacity must be at least 1, not {capacity}')
+
+        try:
+            self.step = INTERVALS[tick_interval]
+        except KeyError:
+            raise RequestError('tickInterval')
+
+        self.market_name = market_name
+        self.tick_interval = tick_interval
+        self.size = 0
+        self._arrays = {
+            name: numpy.empty(capacity, dtype=self._dtype(dtype))
+            for _, name, dtype in CANDLE_COLUMNS
+        }
+
+    @staticmethod
+    def _dtype(dtype):
+        return 'int64' if dtype == 'timestamp' else dtype
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self._arrays['t'])
+
+    @property
+    def columns(self):
+        """dict of column name to a numpy view on the stored candles"""
+        return {
+            name: array[:self.size] for name, array in self._arrays.items()
+        }
+
+    @property
+    def last_timestamp(self):
+        """Epoch milliseconds of the newest candle, None when empty"""
+        if not self.size:
+            return None
+        return int(self._arrays['t'][self.size - 1])
+
+    def _reserve(self, size):
+        capacity = self.capacity
+        if size <= capacity:
+            return
+
+        while capacity < size:
+            capacity *= 2
+
+        for name, array in self._arrays.items():
+            grown = numpy.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self._arrays[name] = grown
+
+    def gap(self, latest):
+        """Returns the (start, end) epoch milliseconds of candles missing
+        between the stored history and the latest candle columns, or None
+        when the latest candle directly follows the stored ones
+
+        The window starts at the newest stored candle, which was likely
+        still forming when it was stored, so merging the window also
+        replaces it with its closed values.
+        """
+        last = self.last_timestamp
+        if last is None or not len(latest['t']):
+            return None
+
+        first = int(latest['t'][0])
+        if first - last > self.step:
+            return last, first - self.step
+        return None
+
+    def gaps(self):
+        """Returns (start, end) of every window missing inside the stored
+        history"""
+        t = self._arrays['t'][:self.size]
+        holes = numpy.nonzero(numpy.diff(t) > self.step)[0]
+        return [
+            (int(t[index]) + self.step, int(t[index + 1]) - self.step)
+            for index in holes
+        ]
+
+    def extend(self, columns, start=None, end=None):
+        """Merge candle columns into the store
+
+        Candles newer than the stored ones are appended, candles with a
+        stored timestamp replace it (the latest candle keeps changing
+        until its interval closes) and older candles are inserted.
+
+        :param columns: columns as returned by get_candles(as_columns=True)
+        :param start: only merge candles at or after this epoch ms
+        :param end: only merge candles at or before this epoch ms
+        """
+        t = columns['t']
+        mask = None
+        if start is not None:
+            mask = t >= start
+        if end is not None:
+            mask = (t <= end) if mask is None else mask & (t <= end)
+        if mask is not None:
+            columns = {name: column[mask] for name, column in columns.items()}
+            t = columns['t']
+
+        if not len(t):
+            return
+
+        last = self.last_timestamp
+        if last is None or (t[0] > last and numpy.all(numpy.diff(t) > 0)):
+            # Fast path, plain append of newer candles
+            self._append(columns)
+            return
+
+        stored = self._arrays['t'][:self.size]
+        positions = numpy.searchsorted(stored, t)
+        exists = positions < self.size
+        exists[exists] = stored[positions[exists]] == t[exists]
+
+        for name, column in columns.items():
+            self._arrays[name][positions[exists]] = column[exists]
+
+        new = ~exists
+        if numpy.any(new):
+            merged = {
+                name: numpy.concatenate(
+                    (array[:self.size], columns[name][new])
+                )
+                for name, array in self._arrays.items()
+            }
+            order = numpy.argsort(merged['t'], kind='stable')
+            self.size = 0
+            self._append({
+                name: column[order] for name, column in merged.items()
+            })
+
+    def _append(self, columns):
+        count = len(columns['t'])
+        self._reserve(self.size + count)
+
+        for name, array in self._arrays.items():
+            array[self.size:self.size + count] = columns[name]
+        self.size += count
+
+    def __repr__(self):
+        return (f'<CandleStore {self.market_name} {self.tick_interval} '
+                f'candles={self.size} last={self.last_timestamp}>')
@@ -0,0 +1,56 @@
+from operator import itemgetter
+
+try:
+    import numpy
+except ModuleNotFoundError:
+    # Note: columnar results not available
+    numpy = None
+
+# (bittrex field, column name, dtype); 'timestamp' columns hold int64
+# epoch milliseconds. Bittrex timestamps are UTC.
+CANDLE_COLUMNS = (
+    ('T', 't', 'timestamp'),
+    ('O', 'o', 'float64'),
+    ('H', 'h', 'float64'),
+    ('L', 'l', 'float64'),
+    ('C', 'c', 'float64'),
+    ('V', 'v', 'float64'),
+    ('BV', 'bv', 'float64'),
+)
+
+TRADE_COLUMNS = (
+    ('Id', 'id', 'int64'),
+    ('TimeStamp', 'time_stamp', 'timestamp'),
+    ('Quantity', 'quantity', 'float64'),
+    ('Price', 'price', 'float64'),
+    ('Total', 'total', 'float64'),
+    ('FillType', 'fill_type', 'str'),
+    ('OrderType', 'order_type', 'str'),
+)
+
+
+def to_columns(rows, columns):
+    """Decode a list of bittrex rows straight into numpy arrays
+
+    :param rows: decoded json result list
+    :param columns: column spec, eg. CANDLE_COLUMNS
+    :returns: dict of column name to numpy array
+    """
+    if numpy is None:
+        raise ModuleNotFoundError('numpy is required for columnar results')
+
+    count = len(rows)
+    result = {}
+    for key, name, dtype in columns:
+        values = map(itemgetter(key), rows)
+
+        if dtype == 'timestamp':
+            result[name] = numpy.array(
+                list(values), dtype='datetime64[ms]'
+            ).astype('int64')
+        elif dtype == 'str':
+            result[name] = numpy.array(list(values), dtype=str)
+        else:
+            result[name] = numpy.fromiter(values, dtype=dtype, count=count)
+
+    return result
@@ -0,0 +1,52 @@
+import json
+
+try:
+    import orjson
+except ModuleNotFoundError:
+    orjson = None
+
+try:
+    import ujson
+except ModuleNotFoundError:
+    ujson = None
+
+try:
+    import simdjson
+except ModuleNotFoundError:
+    simdjson = None
+
+
+def available_decoders():
+    """Returns the json decoders that can be used, fastest first
+
+    Every decoder accepts the raw response body as bytes.
+    """
+    decoders = {}
+    if orjson is not None:
+        decoders['orjson'] = orjson.loads
+    if simdjson is not None:
+        decoders['simdjson'] = simdjson.loads
+    if ujson is not None:
+        decoders['ujson'] = ujson.loads
+    decoders['json'] = json.loads
+    return decoders
+
+
+def get_decoder(decoder=None):
+    """Returns a json decoding function
+
+    :param decoder: None picks the fastest installed decoder, a name
+        (orjson, simdjson, ujson or json) picks that decoder and a
+        callable taking bytes is used as is
+    """
+    if callable(decoder):
+        return decoder
+
+    decoders = available_decoders()
+    if decoder is None:
+        return next(iter(decoders.values()))
+
+    try:
+        return decoders[decoder]
+    except KeyError:
+        raise ValueError(f'json decoder {decoder} is not available')
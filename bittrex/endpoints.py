@@ -0,0 +1,381 @@
+"""Specification of every bittrex api method the sessions call
+
+The url builders of BittrexBaseSession and the plain api methods of
+BittrexSession and BittrexAsyncSession are generated from ENDPOINTS.
+Rate limiter lanes, default cache policies and the endpoints that are
+safe to retry are read from here as well.
+"""
+import inspect
+from urllib.parse import quote_plus
+from .exceptions import RequestError
+from .ratelimit import PRIORITY_ORDER, PRIORITY_ACCOUNT, PRIORITY_PUBLIC
+from .records import (
+    Market, Currency, MarketSummary, Ticker, Trade, OrderBook, Order,
+    Balance, Candle
+)
+
+# tick_interval argument -> tickInterval parameter of the v2 api
+TICK_INTERVALS = {
+    'one_min': 'oneMin',
+    'five_min': 'fiveMin',
+    'thirty_min': 'thirtyMin',
+    'hour': 'hour',
+    'day': 'day',
+}
+
+REQUIRED = object()
+
+
+class Parameter:
+    """Argument of an api method and the query parameter it becomes
+
+    :param argument: name of the python argument
+    :param name: name of the query parameter
+    :param default: default of the argument, None leaves the parameter
+        out of the url
+    :param values: dict translating argument values to parameter values,
+        other values raise RequestError(name)
+    """
+
+    def __init__(self, argument, name, default=REQUIRED, values=None):
+        self.argument = argument
+        self.name = name
+        self.default = default
+        self.values = values
+
+
+class Endpoint:
+    """A single api method
+
+    :param name: name of the session method, the url builder is the
+        same prefixed with an underscore
+    :param path: api method, eg. public/getticker
+    :param version: 1 for the v1.1 api, 2 for the v2.0 api
+    :param signed: send the apikey and nonce and sign the url
+    :param parameters: Parameter per argument, in url order
+    :param record: Record class used when result_mode is records
+    :param idempotent: safe to send again, see RetryPolicy
+    :param priority: rate limiter lane
+    :param cache: default (ttl, maxsize) when caching is enabled, None
+        never caches the endpoint
+    :param alternative: (argument, Endpoint) called instead when the
+        argument is given, eg. getbalance for get_balances(currency)
+    :param doc: docstring of the generated methods
+    """
+
+    def __init__(self, name, path, version=1, signed=False, parameters=(),
+                 record=None, idempotent=True, priority=None, cache=None,
+                 alternative=None, doc=None):
+        self.name = name
+        self.path = path
+        self.version = version
+        self.signed = signed
+        self.parameters = tuple(parameters)
+        self.record = record
+        self.idempotent = idempotent
+        self.cache = cache
+        self.doc = doc
+
+        if priority is None:
+            priority = PRIORITY_ACCOUNT if signed else PRIORITY_PUBLIC
+        self.priority = priority
+
+        self.defaults = tuple(p.default for p in self.parameters)
+        self.index = {
+            p.argument: index for index, p in enumerate(self.parameters)
+        }
+        self.lookups = tuple(
+            (index, p) for index, p in enumerate(self.parameters)
+            if p.values is not None
+        )
+        self.alternative = None
+        if alternative is not None:
+            argument, endpoint = alternative
+            self.alternative = (self.index[argument], endpoint)
+
+    def bind(self, args, kwargs):
+        """Returns the endpoint to call and its parameter values"""
+        if kwargs or len(args) != len(self.parameters):
+            values = self._bind_arguments(args, kwargs)
+        else:
+            values = args
+
+        if self.lookups:
+            values = list(values)
+            for index, parameter in self.lookups:
+                try:
+                    values[index] = parameter.values[values[index]]
+                except KeyError:
+                    raise RequestError(parameter.name)
+
+        if self.alternative is not None:
+            index, endpoint = self.alternative
+            if values[index] is not None:
+                return endpoint, values
+        return self, values
+
+    def _bind_arguments(self, args, kwargs):
+        if len(args) > len(self.parameters):
+            raise TypeError(
+                f'{self.name}() takes {len(self.parameters)} arguments '
+                f'but {len(args)} were given'
+            )
+
+        values = list(args) + list(self.defaults[len(args):])
+        for argument, value in kwargs.items():
+            try:
+                values[self.index[argument]] = value
+            except KeyError:
+                raise TypeError(
+                    f'{self.name}() got an unexpected argument {argument}'
+                )
+
+        for parameter, value in zip(self.parameters, values):
+            if value is REQUIRED:
+                raise TypeError(
+                    f'{self.name}() missing argument {parameter.argument}'
+                )
+        return values
+
+    @property
+    def signature(self):
+        """inspect.Signature of the generated methods, so help(), editors
+        and inspect.signature show the arguments"""
+        kind = inspect.Parameter.POSITIONAL_OR_KEYWORD
+        arguments = [inspect.Parameter('self', kind)]
+        for parameter in self.parameters:
+            if parameter.default is REQUIRED:
+                default = inspect.Parameter.empty
+            else:
+                default = parameter.default
+            arguments.append(
+                inspect.Parameter(parameter.argument, kind, default=default)
+            )
+        return inspect.Signature(arguments)
+
+
+class Template:
+    """Url of an endpoint compiled for one base url and apikey
+
+    Only the nonce and the parameter values are filled in per call.
+    """
+
+    def __init__(self, endpoint, base_url, key_parameter):
+        self.signed = endpoint.signed
+        self.names = tuple(f'{p.name}=' for p in endpoint.parameters)
+
+        if endpoint.signed:
+            self.prefix = f'{base_url}{endpoint.path}?{key_parameter}&nonce='
+        else:
+            self.prefix = f'{base_url}{endpoint.path}'
+
+    def url(self, values, nonce=None):
+        query = '&'.join(
+            f'{name}{quote_plus(str(value))}'
+            for name, value in zip(self.names, values) if value is not None
+        )
+
+        if self.signed:
+            if query:
+                return f'{self.prefix}{nonce}&{query}'
+            return f'{self.prefix}{nonce}'
+
+        if query:
+            return f'{self.prefix}?{query}'
+        return self.prefix
+
+
+MARKET = Parameter('market_name', 'market')
+OPTIONAL_MARKET = Parameter('market_name', 'market', None)
+UUID = Parameter('uuid', 'uuid')
+OPTIONAL_CURRENCY = Parameter('currency', 'currency', None)
+LIMIT_ORDER = (
+    MARKET, Parameter('quantity', 'quantity'), Parameter('rate', 'rate')
+)
+CANDLE = (
+    Parameter('market_name', 'marketName'),
+    Parameter('tick_interval', 'tickInterval', values=TICK_INTERVALS),
+)
+
+ENDPOINTS = (
+    Endpoint(
+        'get_markets', 'public/getmarkets', record=Market, cache=(300, 1),
+        doc='Retrieve public markets'
+    ),
+    Endpoint(
+        'get_market_summaries', 'public/getmarketsummaries',
+        parameters=[OPTIONAL_MARKET], record=MarketSummary, cache=(1, 1),
+        alternative=('market_name', Endpoint(
+            'get_market_summary', 'public/getmarketsummary',
+            parameters=[OPTIONAL_MARKET], record=MarketSummary,
+            cache=(1, 1024)
+        )),
+        doc='Retrieve last 24h public active market summaries\n\n'
+            ':param market_name: If provided, return summary of specific '
+            'market'
+    ),
+    Endpoint(
+        'get_market_history', 'public/getmarkethistory',
+        parameters=[MARKET], record=Trade, cache=(1, 256),
+        doc='Retrieve the latest trades that occured for given market'
+    ),
+    Endpoint(
+        'get_currencies', 'public/getcurrencies', record=Currency,
+        cache=(300, 1), doc='Retrieve public currencies'
+    ),
+    Endpoint(
+        'get_ticker', 'public/getticker', parameters=[MARKET],
+        record=Ticker, cache=(0.5, 1024),
+        doc='Retrieve current ticker for given market_name'
+    ),
+    Endpoint(
+        'get_order_book', 'public/getorderbook', signed=True,
+        priority=PRIORITY_PUBLIC,
+        parameters=[MARKET, Parameter('order_type', 'type', 'both')],
+        record=OrderBook,
+        doc='Retrieve orderbook of given market\n\n'
+            ':param order_type: buy, sell or both'
+    ),
+    Endpoint(
+        'buy_limit', 'market/buylimit', signed=True, parameters=LIMIT_ORDER,
+        idempotent=False, priority=PRIORITY_ORDER,
+        doc='Place a limit buy order in a specific market'
+    ),
+    Endpoint(
+        'sell_limit', 'market/selllimit', signed=True,
+        parameters=LIMIT_ORDER, idempotent=False, priority=PRIORITY_ORDER,
+        doc='Place a limit sell order in a specific market'
+    ),
+    Endpoint(
+        'cancel_order', 'market/cancel', signed=True, parameters=[UUID],
+        idempotent=False, priority=PRIORITY_ORDER,
+        doc='Cancel a buy or sell order'
+    ),
+    Endpoint(
+        'get_open_orders', 'market/getopenorders', signed=True,
+        parameters=[OPTIONAL_MARKET], record=Order,
+        doc='Get all orders that you currently have opened, optionally '
+            'limited to market_name'
+    ),
+    Endpoint(
+        'get_order', 'account/getorder', signed=True, parameters=[UUID],
+        record=Order, doc='Get single order by uuid'
+    ),
+    Endpoint(
+        'get_order_history', 'account/getorderhistory', signed=True,
+        parameters=[OPTIONAL_MARKET], record=Order,
+        doc='Retrieve your order history'
+    ),
+    Endpoint(
+        'get_balances', 'account/getbalances', signed=True,
+        parameters=[OPTIONAL_CURRENCY], record=Balance,
+        alternative=('currency', Endpoint(
+            'get_balance', 'account/getbalance', signed=True,
+            parameters=[OPTIONAL_CURRENCY], record=Balance
+        )),
+        doc='Retrieve all balances from your account\n\n'
+            ':param currency: optional limit to specific currency, eg. LTC'
+    ),
+    Endpoint(
+        'get_deposit_address', 'account/getdepositaddress', signed=True,
+        parameters=[Parameter('currency', 'currency')],
+        doc='Retrieve or generate an address for a specific currency. If '
+            'one does not exist, the call will fail and return '
+            'ADDRESS_GENERATING until one is available.'
+    ),
+    Endpoint(
+        'withdraw', 'account/withdraw', signed=True,
+        parameters=[
+            Parameter('currency', 'currency'),
+            Parameter('quantity', 'quantity'),
+            Parameter('address', 'address'),
+            Parameter('payment_id', 'paymentid', None),
+        ],
+        idempotent=False,
+        doc='Withdraw funds from your account. note: please account for '
+            'txfee.\n\n'
+            ':param payment_id: used for CryptoNotes/BitShareX/Nxt '
+            '(memo/paymentid)'
+    ),
+    Endpoint(
+        'get_withdrawal_history', 'account/getwithdrawalhistory',
+        signed=True, parameters=[OPTIONAL_CURRENCY],
+        doc='Retrieve your withdrawal history'
+    ),
+    Endpoint(
+        'get_deposit_history', 'account/getdeposithistory', signed=True,
+        parameters=[OPTIONAL_CURRENCY], doc='Retrieve your deposit history'
+    ),
+    # NOTE: Endpoints below this point are using the beta v2 version
+    # use at your own risk..
+    Endpoint(
+        'get_candles', 'pub/market/GetTicks', version=2, parameters=CANDLE,
+        record=Candle,
+        doc='Gets candles for given market_name\n\n'
+            ':param tick_interval: one_min, five_min, thirty_min, hour or '
+            'day'
+    ),
+    Endpoint(
+        'get_latest_candle', 'pub/market/GetLatestTick', version=2,
+        parameters=CANDLE, record=Candle,
+        doc='Gets latest candle for given market_name\n\n'
+            ':param tick_interval: one_min, five_min, thirty_min, hour or '
+            'day'
+    ),
+)
+
+
+def _all_endpoints():
+    for endpoint in ENDPOINTS:
+        yield endpoint
+        if endpoint.alternative is not None:
+            yield endpoint.alternative[1]
+
+
+ENDPOINTS_BY_PATH = {endpoint.path: endpoint for endpoint in _all_endpoints()}
+
+
+def _method(endpoint, function):
+    function.__name__ = endpoint.name
+    function.__qualname__ = endpoint.name
+    function.__doc__ = endpoint.doc
+    function.__signature__ = endpoint.signature
+    return function
+
+
+def url_builder(endpoint):
+    """Returns the _<name> url builder method of endpoint"""
+    def build(self, *args, **kwargs):
+        return self._build_url(endpoint, args, kwargs)
+
+    build = _method(endpoint, build)
+    build.__name__ = build.__qualname__ = f'_{endpoint.name}'
+    return build
+
+
+def sync_method(endpoint):
+    """Returns the BittrexSession method of endpoint"""
+    def call(self, *args, **kwargs):
+        url = self._build_url(endpoint, args, kwargs)
+        return self._get(url, record=endpoint.record)
+
+    return _method(endpoint, call)
+
+
+def async_method(endpoint):
+    """Returns the BittrexAsyncSession method of endpoint"""
+    async def call(self, *args, **kwargs):
+        url = self._build_url(endpoint, args, kwargs)
+        return await self._get(url, record=endpoint.record)
+
+    return _method(endpoint, call)
+
+
+def add_endpoint_methods(cls, factory, prefix=''):
+    """Add a method made by factory for every endpoint to cls, methods
+    cls defines itself are kept"""
+    for endpoint in ENDPOINTS:
+        name = f'{prefix}{endpoint.name}'
+        if name not in cls.__dict__:
+            setattr(cls, name, factory(endpoint))
+    return cls
@@ -5,3 +5,16 @@ class ResponseError(Exception):
 class RequestError(Exception):
     """Raised when the request towards the bittrex
     API is incorrect or fails"""
+
+
+class AmbiguousOrderError(ResponseError):
+    """Raised when it is unknown whether an order action reached the
+    bittrex API, eg. a buy that timed out"""
+
+
+class HTTPStatusError(ResponseError):
+    """Raised when the bittrex API answers with a non 200 status"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
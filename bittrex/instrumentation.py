@@ -0,0 +1,195 @@
+"""Per endpoint timings and sizes of api calls
+
+Sessions created with the instrumentation option report, per call:
+
+- ttfb: seconds from sending the request until the response headers
+- read: seconds reading the response body
+- decode: seconds decoding the json body
+- bytes: size of the response body
+- parse: seconds building the result items in _parse_response
+- rows: number of result items
+"""
+import logging
+import math
+import threading
+
+# metric: (prometheus name, help)
+METRICS = {
+    'ttfb': ('bittrex_request_ttfb_seconds',
+             'Seconds until the response headers arrived'),
+    'read': ('bittrex_response_read_seconds',
+             'Seconds reading the response body'),
+    'decode': ('bittrex_response_decode_seconds',
+               'Seconds decoding the json body'),
+    'bytes': ('bittrex_response_bytes', 'Size of the response body'),
+    'parse': ('bittrex_response_parse_seconds',
+              'Seconds building the result items'),
+    'rows': ('bittrex_response_rows', 'Number of result items'),
+}
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Buckets per power of two, values are kept within 1 / (2 * SUB_BUCKETS)
+SUB_BUCKETS = 128
+
+
+class Histogram:
+    """Log-linear histogram in the style of HdrHistogram
+
+    Values are counted in buckets of constant relative width, so
+    quantiles keep about 0.4% precision over any range of values while
+    memory only grows with the number of distinct buckets seen.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value):
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        if value <= 0:
+            self.zeros += 1
+            return
+
+        mantissa, exponent = math.frexp(value)
+        key = exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    @staticmethod
+    def _bucket_value(key):
+        exponent, sub_bucket = divmod(key, SUB_BUCKETS)
+        mantissa = 0.5 + (sub_bucket + 0.5) / (2 * SUB_BUCKETS)
+        return math.ldexp(mantissa, exponent)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q):
+        """Value below which a fraction q of the recorded values falls"""
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                # Stay within the exact extremes
+                return min(max(self._bucket_value(key), self.min), self.max)
+        return self.max
+
+
+class HistogramSink:
+    """Keeps a Histogram per endpoint and metric in memory"""
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, metrics):
+        with self._lock:
+            for metric, value in metrics.items():
+                histogram = self.histograms.get((endpoint, metric))
+                if histogram is None:
+                    histogram = self.histograms[endpoint, metric] = Histogram()
+                histogram.record(value)
+
+    def histogram(self, endpoint, metric):
+        return self.histograms.get((endpoint, metric))
+
+    def summary(self):
+        """dict of endpoint to metric to count, mean, quantiles and max"""
+        summary = {}
+        with self._lock:
+            for (endpoint, metric), histogram in self.histograms.items():
+                values = {
+                    'count': histogram.count,
+                    'mean': histogram.mean,
+                    'max': histogram.max,
+                }
+                for q in QUANTILES:
+                    values[f'p{q * 100:g}'] = histogram.quantile(q)
+                summary.setdefault(endpoint, {})[metric] = values
+        return summary
+
+
+class LoggingSink:
+    """Logs one line per observation
+
+    :param logger: defaults to the bittrex.instrumentation logger
+    :param level: logging level of the lines
+    """
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def observe(self, endpoint, metrics):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, '%s %s', endpoint, ' '.join(
+                f'{metric}={value:g}' for metric, value in metrics.items()
+            ))
+
+
+class PrometheusExporter:
+    """Renders the histograms of a HistogramSink in the Prometheus text
+    exposition format, as summaries labelled by endpoint"""
+
+    def __init__(self, sink):
+        self.sink = sink
+
+    def render(self):
+        lines = []
+        with self.sink._lock:
+            histograms = sorted(self.sink.histograms.items())
+
+        for metric, (name, description) in METRICS.items():
+            series = [
+                (endpoint, histogram)
+                for (endpoint, observed), histogram in histograms
+                if observed == metric
+            ]
+            if not series:
+                continue
+
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} summary')
+            for endpoint, histogram in series:
+                label = f'endpoint="{endpoint}"'
+                for q in QUANTILES:
+                    lines.append(
+                        f'{name}{{{label},quantile="{q}"}} '
+                        f'{histogram.quantile(q):g}'
+                    )
+                lines.append(f'{name}_sum{{{label}}} {histogram.sum:g}')
+                lines.append(f'{name}_count{{{label}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+class Instrumentation:
+    """Passes the observations of a session to its sinks
+
+    :param sinks: objects with an observe(endpoint, metrics) method,
+        defaults to a single HistogramSink
+    """
+
+    def __init__(self, *sinks):
+        self.sinks = sinks or (HistogramSink(),)
+
+    def observe(self, endpoint, metrics):
+        for sink in self.sinks:
+            sink.observe(endpoint, metrics)
@@ -0,0 +1,60 @@
+import fcntl
+import os
+import struct
+import threading
+from time import time
+
+_COUNTER = struct.Struct('<q')
+
+
+class NonceGenerator:
+    """Strictly increasing millisecond nonces
+
+    Follows the wall clock but never repeats or goes back, also not when
+    the clock is set back. Safe to share between threads and coroutines.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = 0
+
+    def __call__(self):
+        with self._lock:
+            self._last = max(self._last + 1, int(time() * 1000))
+            return self._last
+
+
+class FileNonceGenerator(NonceGenerator):
+    """Nonces coordinated between processes through a counter file
+
+    Every process using the same api key should point at the same path.
+
+    :param path: file holding the last handed out nonce
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def __call__(self):
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(self._fd, _COUNTER.size, 0)
+                last = _COUNTER.unpack(data)[0] if data else 0
+
+                self._last = max(
+                    last + 1, self._last + 1, int(time() * 1000)
+                )
+                os.pwrite(self._fd, _COUNTER.pack(self._last), 0)
+                return self._last
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        os.close(self._fd)
+
+
+# Shared by all sessions of this process unless one is given explicitly
+default_nonce_generator = NonceGenerator()
@@ -0,0 +1,223 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain
+
+BUY = 'buy'
+SELL = 'sell'
+
+
+class BookSide:
+    """One side of an order book
+
+    Price levels live in two parallel arrays of doubles sorted from the
+    best rate outwards. Bids are stored with negated rates so both sides
+    sort ascending. Prefix sums for depth and VWAP queries are rebuilt
+    lazily after the side changed.
+
+    :param descending: True for the buy side
+    """
+
+    def __init__(self, descending=False):
+        self.sign = -1.0 if descending else 1.0
+        self.keys = array('d')
+        self.quantities = array('d')
+        self._cumulative = None
+        self._notional = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def load(self, levels):
+        """Replace all levels with (rate, quantity) pairs"""
+        sign = self.sign
+        levels = sorted((sign * rate, quantity) for rate, quantity in levels)
+        self.keys = array('d', (key for key, _ in levels))
+        self.quantities = array('d', (quantity for _, quantity in levels))
+        self._invalidate()
+
+    def set(self, rate, quantity):
+        """Set the quantity at rate, a quantity of 0 removes the level"""
+        key = self.sign * rate
+        index = bisect_left(self.keys, key)
+        exists = index < len(self.keys) and self.keys[index] == key
+
+        if quantity:
+            if exists:
+                self.quantities[index] = quantity
+            else:
+                self.keys.insert(index, key)
+                self.quantities.insert(index, quantity)
+        elif exists:
+            del self.keys[index]
+            del self.quantities[index]
+        self._invalidate()
+
+    def _invalidate(self):
+        self._cumulative = None
+        self._notional = None
+
+    def _prefix_sums(self):
+        if self._cumulative is None:
+            sign = self.sign
+            self._cumulative = array(
+                'd', chain((0.0,), accumulate(self.quantities))
+            )
+            self._notional = array('d', chain((0.0,), accumulate(
+                sign * key * quantity
+                for key, quantity in zip(self.keys, self.quantities)
+            )))
+        return self._cumulative, self._notional
+
+    def rate(self, index):
+        return self.sign * self.keys[index]
+
+    @property
+    def best(self):
+        """(rate, quantity) of the best level or None for an empty side"""
+        if not self.keys:
+            return None
+        return self.rate(0), self.quantities[0]
+
+    def quantity_at(self, rate):
+        """Quantity offered at exactly rate"""
+        key = self.sign * rate
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return self.quantities[index]
+        return 0.0
+
+    def depth(self, rate):
+        """Cumulative quantity from the best level up to and including
+        rate"""
+        cumulative, _ = self._prefix_sums()
+        return cumulative[bisect_right(self.keys, self.sign * rate)]
+
+    @property
+    def total(self):
+        cumulative, _ = self._prefix_sums()
+        return cumulative[-1]
+
+    def vwap(self, quantity):
+        """Volume weighted average rate to fill quantity, None when the
+        side is not deep enough"""
+        cumulative, notional = self._prefix_sums()
+        if quantity <= 0 or quantity > cumulative[-1]:
+            return None
+
+        # Levels before index - 1 are filled completely
+        index = bisect_left(cumulative, quantity)
+        remaining = quantity - cumulative[index - 1]
+        filled = notional[index - 1] + remaining * self.rate(index - 1)
+        return filled / quantity
+
+    def diff(self, levels):
+        """Returns the (rate, quantity) updates turning this side into
+        levels, removed levels get a quantity of 0"""
+        sign = self.sign
+        new = sorted((sign * rate, quantity) for rate, quantity in levels)
+        keys, quantities = self.keys, self.quantities
+
+        updates = []
+        i = j = 0
+        while i < len(keys) or j < len(new):
+            if j == len(new) or (i < len(keys) and keys[i] < new[j][0]):
+                updates.append((sign * keys[i], 0.0))
+                i += 1
+            elif i == len(keys) or new[j][0] < keys[i]:
+                updates.append((sign * new[j][0], new[j][1]))
+                j += 1
+            else:
+                if quantities[i] != new[j][1]:
+                    updates.append((sign * keys[i], new[j][1]))
+                i += 1
+                j += 1
+        return updates
+
+
+def _levels(rows):
+    return ((row['Rate'], row['Quantity']) for row in rows or ())
+
+
+class LocalOrderBook:
+    """Local order book built from getorderbook snapshots
+
+    :param market_name: Name of the market
+    """
+
+    def __init__(self, market_name=None):
+        self.market_name = market_name
+        self.buy = BookSide(descending=True)
+        self.sell = BookSide()
+
+    @classmethod
+    def from_result(cls, result, market_name=None):
+        """Build a book from the decoded getorderbook result (type both)"""
+        book = cls(market_name)
+        book.buy.load(_levels(result.get('buy')))
+        book.sell.load(_levels(result.get('sell')))
+        return book
+
+    def diff(self, result):
+        """Returns the (side, rate, quantity) updates from this book to
+        the getorderbook result, a quantity of 0 removes the level"""
+        updates = [
+            (BUY, rate, quantity)
+            for rate, quantity in self.buy.diff(_levels(result.get('buy')))
+        ]
+        updates.extend(
+            (SELL, rate, quantity)
+            for rate, quantity in self.sell.diff(_levels(result.get('sell')))
+        )
+        return updates
+
+    def apply(self, updates):
+        """Apply (side, rate, quantity) updates"""
+        for side, rate, quantity in updates:
+            self.side(side).set(rate, quantity)
+
+    def update(self, result):
+        """Bring the book in line with a new snapshot and return the
+        updates that were applied"""
+        updates = self.diff(result)
+        self.apply(updates)
+        return updates
+
+    def side(self, side):
+        if side == BUY:
+            return self.buy
+        elif side == SELL:
+            return self.sell
+        raise ValueError(f'Unknown order book side {side}')
+
+    @property
+    def best_bid(self):
+        return self.buy.best
+
+    @property
+    def best_ask(self):
+        return self.sell.best
+
+    @property
+    def spread(self):
+        if not self.buy or not self.sell:
+            return None
+        return self.sell.rate(0) - self.buy.rate(0)
+
+    def depth_at(self, side, rate):
+        """Quantity offered at exactly rate"""
+        return self.side(side).quantity_at(rate)
+
+    def cumulative_depth(self, side, rate):
+        """Quantity offered from the best rate up to and including rate"""
+        return self.side(side).depth(rate)
+
+    def vwap(self, side, quantity):
+        """Average rate when taking quantity from side, eg. buying
+        quantity takes from the sell side"""
+        return self.side(side).vwap(quantity)
+
+    def __repr__(self):
+        return (f'<LocalOrderBook {self.market_name} '
+                f'bids={len(self.buy)} asks={len(self.sell)} '
+                f'best_bid={self.best_bid} '
+                f'best_ask={self.best_ask}>')
@@ -0,0 +1,185 @@
+import asyncio
+import heapq
+import itertools
+import threading
+from time import monotonic
+
+# Lanes, lower goes first
+PRIORITY_ORDER = 0  # placing and cancelling orders
+PRIORITY_ACCOUNT = 1  # other signed calls
+PRIORITY_PUBLIC = 2  # public market data
+
+LANES = {
+    PRIORITY_ORDER: 'order',
+    PRIORITY_ACCOUNT: 'account',
+    PRIORITY_PUBLIC: 'public',
+}
+
+
+class TokenBucket:
+    """Token bucket refilled at rate tokens per second up to burst
+
+    The bucket holds at least one token, so rates below one request per
+    second still let a request through every 1 / rate seconds.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = max(1, burst or rate)
+        self.tokens = self.capacity
+        self.updated = monotonic()
+
+    def delay(self):
+        """Seconds until a token is available, 0 if one is available now"""
+        now = monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+
+class LaneStats:
+    """Queue depth and wait time of a single priority lane"""
+
+    def __init__(self):
+        self.depth = 0
+        self.max_depth = 0
+        self.count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def enqueue(self):
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+    def dequeue(self, wait):
+        self.depth -= 1
+        self.count += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self):
+        return {
+            'queue_depth': self.depth,
+            'max_queue_depth': self.max_depth,
+            'requests': self.count,
+            'total_wait': self.total_wait,
+            'mean_wait': self.total_wait / self.count if self.count else 0.0,
+            'max_wait': self.max_wait,
+        }
+
+
+class BaseRateLimiter:
+    """Token bucket with priority lanes
+
+    Waiting requests are served strictly by lane and first come first
+    served within a lane, so order calls overtake queued market data calls.
+
+    :param rate: requests per second
+    :param burst: maximum number of requests sent back to back,
+        defaults to rate and is at least 1
+    """
+
+    def __init__(self, rate, burst=None):
+        self.bucket = TokenBucket(rate, burst)
+        self.stats = {priority: LaneStats() for priority in LANES}
+        self._waiting = []
+        self._sequence = itertools.count()
+
+    def _enqueue(self, priority):
+        ticket = (priority, next(self._sequence))
+        heapq.heappush(self._waiting, ticket)
+        self.stats[priority].enqueue()
+        return ticket
+
+    def _dequeue(self, ticket, started):
+        if self._waiting[0] == ticket:
+            heapq.heappop(self._waiting)
+        else:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+        self.stats[ticket[0]].dequeue(monotonic() - started)
+
+    def metrics(self):
+        """Queue depth and wait times per lane"""
+        return {
+            name: self.stats[priority].as_dict()
+            for priority, name in LANES.items()
+        }
+
+
+class RateLimiter(BaseRateLimiter):
+    """Thread safe rate limiter for BittrexSession"""
+
+    def __init__(self, rate, burst=None):
+        super().__init__(rate, burst)
+        self._condition = threading.Condition()
+
+    def acquire(self, priority=PRIORITY_PUBLIC):
+        """Block until the request may be sent"""
+        started = monotonic()
+        with self._condition:
+            ticket = self._enqueue(priority)
+            self._condition.notify_all()
+            try:
+                while True:
+                    if self._waiting[0] != ticket:
+                        self._condition.wait()
+                        continue
+
+                    delay = self.bucket.delay()
+                    if delay <= 0:
+                        self.bucket.consume()
+                        return
+                    self._condition.wait(delay)
+            finally:
+                self._dequeue(ticket, started)
+                self._condition.notify_all()
+
+
+class AsyncRateLimiter(BaseRateLimiter):
+    """Rate limiter for BittrexAsyncSession"""
+
+    def __init__(self, rate, burst=None):
+        super().__init__(rate, burst)
+        self._changed = None
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    async def _wait(self, timeout=None):
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def acquire(self, priority=PRIORITY_PUBLIC):
+        """Wait until the request may be sent"""
+        started = monotonic()
+        ticket = self._enqueue(priority)
+        self._notify()
+        try:
+            while True:
+                if self._waiting[0] != ticket:
+                    await self._wait()
+                    continue
+
+                delay = self.bucket.delay()
+                if delay <= 0:
+                    self.bucket.consume()
+                    return
+                await self._wait(delay)
+        finally:
+            self._dequeue(ticket, started)
+            self._notify()
@@ -0,0 +1,131 @@
+from .response import Response, convert_key, parse_timestamp, TIMESTAMP_FIELDS
+
+
+class Record:
+    """Base for slotted, schema specific response items
+
+    Attribute names are the same snake_case names a Response gets.
+    Fields missing from a row are left unset, just like on a Response.
+    """
+    __slots__ = ()
+    _fields = ()
+    _keys = frozenset()
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a decoded bittrex row
+
+        Rows carrying fields this record does not know about fall back
+        to a plain Response so no data gets lost.
+        """
+        if not data.keys() <= cls._keys:
+            return Response(**data)
+
+        record = cls.__new__(cls)
+        for key, setter, is_timestamp in cls._fields:
+            try:
+                value = data[key]
+            except KeyError:
+                continue
+
+            if is_timestamp and value is not None:
+                try:
+                    value = parse_timestamp(value)
+                except TypeError:
+                    pass
+            setter(record, value)
+        return record
+
+    def __repr__(self):
+        description = f"<{type(self).__name__}"
+
+        for attribute in self.__slots__:
+            try:
+                value = getattr(self, attribute)
+            except AttributeError:
+                continue
+            description += f" {attribute}={value}"
+
+        description += ">"
+        return description
+
+
+def record_type(name, fields):
+    """Create a slotted Record class for a known set of bittrex fields
+
+    :param name: Name of the generated class
+    :param fields: CamelCase field names as returned by the api
+    """
+    attributes = tuple(convert_key(field) for field in fields)
+    cls = type(name, (Record,), {
+        '__slots__': attributes,
+        '__module__': __name__,
+        '_keys': frozenset(fields),
+    })
+    cls._fields = tuple(
+        (field, getattr(cls, attribute).__set__, field in TIMESTAMP_FIELDS)
+        for field, attribute in zip(fields, attributes)
+    )
+    return cls
+
+
+Market = record_type('Market', [
+    'MarketCurrency', 'BaseCurrency', 'MarketCurrencyLong',
+    'BaseCurrencyLong', 'MinTradeSize', 'MarketName', 'IsActive',
+    'IsRestricted', 'Created', 'Notice', 'IsSponsored', 'LogoUrl'
+])
+
+Currency = record_type('Currency', [
+    'Currency', 'CurrencyLong', 'MinConfirmation', 'TxFee', 'IsActive',
+    'IsRestricted', 'CoinType', 'BaseAddress', 'Notice'
+])
+
+MarketSummary = record_type('MarketSummary', [
+    'MarketName', 'High', 'Low', 'Volume', 'Last', 'BaseVolume',
+    'TimeStamp', 'Bid', 'Ask', 'OpenBuyOrders', 'OpenSellOrders',
+    'PrevDay', 'Created', 'DisplayMarketName'
+])
+
+Ticker = record_type('Ticker', ['Bid', 'Ask', 'Last'])
+
+Trade = record_type('Trade', [
+    'Id', 'TimeStamp', 'Quantity', 'Price', 'Total', 'FillType',
+    'OrderType', 'Uuid'
+])
+
+OrderBookEntry = record_type('OrderBookEntry', ['Quantity', 'Rate'])
+
+# Union of the fields returned by getopenorders, getorder and
+# getorderhistory
+Order = record_type('Order', [
+    'AccountId', 'Uuid', 'OrderUuid', 'Exchange', 'Type', 'OrderType',
+    'Quantity', 'QuantityRemaining', 'Limit', 'Reserved',
+    'ReserveRemaining', 'CommissionReserved', 'CommissionReserveRemaining',
+    'CommissionPaid', 'Commission', 'Price', 'PricePerUnit', 'TimeStamp',
+    'Opened', 'Closed', 'IsOpen', 'Sentinel', 'CancelInitiated',
+    'ImmediateOrCancel', 'IsConditional', 'Condition', 'ConditionTarget'
+])
+
+Balance = record_type('Balance', [
+    'Currency', 'Balance', 'Available', 'Pending', 'CryptoAddress',
+    'Requested', 'Uuid'
+])
+
+Candle = record_type('Candle', ['O', 'H', 'L', 'C', 'V', 'T', 'BV'])
+
+
+class OrderBook(Record):
+    """Order book with both sides, each a list of OrderBookEntry"""
+    __slots__ = ('buy', 'sell')
+    _keys = frozenset(['buy', 'sell'])
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data.keys() <= cls._keys:
+            return Response(**data)
+
+        record = cls.__new__(cls)
+        entry = OrderBookEntry.from_dict
+        record.buy = [entry(row) for row in data.get('buy') or ()]
+        record.sell = [entry(row) for row in data.get('sell') or ()]
+        return record
@@ -0,0 +1,115 @@
+from decimal import Decimal
+from time import monotonic
+from .exceptions import RequestError
+
+# Bittrex accepts quantities and rates with at most 8 decimals
+PRECISION = 8
+
+
+class MarketRegistry:
+    """Markets and currencies indexed for constant time lookups
+
+    Filled from getmarkets and getcurrencies by the sessions, see
+    load_registry and start_registry_refresh.
+
+    :param ttl: seconds after which the registry is considered stale
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.loaded = None
+        self.precision = PRECISION
+        self._markets = {}
+        self._by_base_currency = {}
+        self._by_market_currency = {}
+        self._currencies = {}
+
+    @property
+    def stale(self):
+        return self.loaded is None or monotonic() - self.loaded > self.ttl
+
+    def load(self, markets, currencies):
+        """Replace the indexes with freshly retrieved markets and currencies
+
+        :param markets: items returned by get_markets()
+        :param currencies: items returned by get_currencies()
+        """
+        by_name = {}
+        by_base_currency = {}
+        by_market_currency = {}
+        for market in markets:
+            by_name[market.market_name] = market
+            by_base_currency.setdefault(
+                market.base_currency, []
+            ).append(market)
+            by_market_currency.setdefault(
+                market.market_currency, []
+            ).append(market)
+
+        # Swap complete indexes so readers never see a partial load
+        self._markets = by_name
+        self._by_base_currency = by_base_currency
+        self._by_market_currency = by_market_currency
+        self._currencies = {
+            currency.currency: currency for currency in currencies
+        }
+        self.loaded = monotonic()
+
+    def __len__(self):
+        return len(self._markets)
+
+    def __contains__(self, market_name):
+        return market_name in self._markets
+
+    def __iter__(self):
+        return iter(self._markets.values())
+
+    def get(self, market_name):
+        """Returns the market called market_name"""
+        try:
+            return self._markets[market_name]
+        except KeyError:
+            raise RequestError(f'Could not find {market_name}')
+
+    def get_currency(self, currency):
+        try:
+            return self._currencies[currency]
+        except KeyError:
+            raise RequestError(f'Could not find {currency}')
+
+    def by_base_currency(self, currency):
+        """Returns all markets trading against currency, eg. 'BTC'"""
+        return list(self._by_base_currency.get(currency, ()))
+
+    def by_market_currency(self, currency):
+        """Returns all markets in which currency is traded, eg. 'LTC'"""
+        return list(self._by_market_currency.get(currency, ()))
+
+    def min_trade_size(self, market_name):
+        return self.get(market_name).min_trade_size
+
+    def validate_order(self, market_name, quantity, rate):
+        """Raise RequestError when bittrex would reject the order
+
+        :param market_name: Name of the market
+        :param quantity (float): amount to buy or sell
+        :param rate (float): rate at which to place the order
+        """
+        market = self.get(market_name)
+
+        if not market.is_active:
+            raise RequestError(f'{market_name} is not active')
+
+        if quantity < market.min_trade_size:
+            raise RequestError(
+                f'{market_name} quantity {quantity} is below the minimum '
+                f'trade size {market.min_trade_size}'
+            )
+
+        for name, value in (('quantity', quantity), ('rate', rate)):
+            exponent = Decimal(str(value)).normalize().as_tuple().exponent
+            if -exponent > self.precision:
+                raise RequestError(
+                    f'{market_name} {name} {value} has more than '
+                    f'{self.precision} decimals'
+                )
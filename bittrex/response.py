@@ -2,34 +2,89 @@ import re
 import json
 import time
 
-TIMESTAMP_FIELDS = [
+TIMESTAMP_FIELDS = frozenset([
     'Created', 'TimeStamp', 'Opened', 'Closed',
     'LastChecked', 'T', 'LastUpdated'
-]  # T is used for api v2 candle timestamp...
+])  # T is used for api v2 candle timestamp...
+
+_FIRST_CAP = re.compile('(.)([A-Z][a-z]+)')
+_ALL_CAP = re.compile('([a-z0-9])([A-Z])')
+
+# Bittrex timestamps look like 2018-03-23T12:00:05.123 or 2018-03-23T12:00:05
+_TIMESTAMP = re.compile(
+    r'([0-9]{4})-([0-9]{2})-([0-9]{2})T'
+    r'([0-9]{2}):([0-9]{2}):([0-9]{2})(?:\.[0-9]{1,6})?'
+)
+
+# CamelCase -> snake_case translations, filled on first use of each key
+_KEY_CACHE = {}
+# snake_case -> CamelCase candidates for every key seen so far
+_ATTRIBUTE_KEYS = {}
+
+
+def convert_key(name):
+    """Converts CamelCase to snake_case, caching the result per key"""
+    try:
+        return _KEY_CACHE[name]
+    except KeyError:
+        s1 = _FIRST_CAP.sub(r'\1_\2', name)
+        converted = _ALL_CAP.sub(r'\1_\2', s1).lower()
+        _KEY_CACHE[name] = converted
+        _ATTRIBUTE_KEYS.setdefault(converted, []).append(name)
+        return converted
+
+
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _days_in_month(year, month):
+    if month == 2 and year % 4 == 0 and (year % 100 or year % 400 == 0):
+        return 29
+    return _DAYS_IN_MONTH[month]
+
+
+def parse_timestamp(value):
+    """Converts a bittrex timestamp string to a unix timestamp
+
+    The common formats are decoded directly, anything else falls back
+    to time.strptime so the results and errors stay the same.
+    """
+    match = _TIMESTAMP.fullmatch(value)
+    if match is not None:
+        year, month, day, hour, minute, second = map(int, match.groups())
+        # Out of range fields are left to strptime, which rejects them
+        # instead of letting mktime normalize them
+        if (1 <= month <= 12 and 1 <= day <= _days_in_month(year, month)
+                and hour <= 23 and minute <= 59 and second <= 61):
+            return time.mktime((
+                year, month, day, hour, minute, second, 0, 0, -1
+            ))
+
+    try:
+        return time.mktime(time.strptime(value, '%Y-%m-%dT%H:%M:%S.%f'))
+    except ValueError:
+        # Some returns do not have the microsecond
+        return time.mktime(time.strptime(value, '%Y-%m-%dT%H:%M:%S'))
+
+
+def convert_value(key, value):
+    """Converts a single bittrex field value to its python representation"""
+    if key in TIMESTAMP_FIELDS and value is not None:
+        try:
+            return parse_timestamp(value)
+        except TypeError:
+            # value is not a string
+            return value
+    return value
 
 
 class Response:
     """Class representing a single response item from Bittrex api"""
 
     def __init__(self, **kwargs):
+        attributes = self.__dict__
         for key, value in kwargs.items():
-            if key in TIMESTAMP_FIELDS and value is not None:
-                try:
-                    timestamp = time.mktime(
-                        time.strptime(value, '%Y-%m-%dT%H:%M:%S.%f')
-                    )
-                except ValueError:
-                    # Some returns do not have the microsecond
-                    timestamp = time.mktime(
-                        time.strptime(value, '%Y-%m-%dT%H:%M:%S')
-                    )
-                except TypeError:
-                    # value is None
-                    timestamp = value
-
-                setattr(self, self._convert_to_camel(key), timestamp)
-            else:
-                setattr(self, self._convert_to_camel(key), value)
+            attributes[convert_key(key)] = convert_value(key, value)
 
     def __repr__(self):
         description = f"<Response"
@@ -40,11 +95,15 @@ class Response:
         description += ">"
         return description
 
+    @classmethod
+    def from_dict(cls, data):
+        """Build a Response from a decoded bittrex row"""
+        return cls(**data)
+
     @staticmethod
     def _convert_to_camel(name):
         """Converts CamelCase to snake_case"""
-        s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
-        return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+        return convert_key(name)
 
     @classmethod
     def load_from_json(cls, response_type, data):
@@ -52,3 +111,76 @@ class Response:
 
         kwargs = json.loads(data)
         return cls(response_type, kwargs)
+
+
+# The instance dict descriptor, LazyResponse shadows __dict__
+_instance_dict = Response.__dict__['__dict__'].__get__
+
+
+class LazyResponse(Response):
+    """Response item that keeps the raw row and converts each field on
+    first access. Converted values are memoized on the instance.
+
+    Reading __dict__, or vars() of the item, converts all fields, so it
+    lists every field as with a plain Response.
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, **kwargs):
+        self._data = kwargs
+
+    @classmethod
+    def from_dict(cls, data):
+        """Wrap a decoded bittrex row without converting it"""
+        response = cls.__new__(cls)
+        response._data = data
+        return response
+
+    def _find_key(self, name):
+        data = self._data
+        for key in _ATTRIBUTE_KEYS.get(name, ()):
+            if key in data:
+                return key
+
+        # Translate the keys of this row we have not seen before
+        for key in data:
+            if key not in _KEY_CACHE and convert_key(key) == name:
+                return key
+        raise AttributeError(name)
+
+    def __getattr__(self, name):
+        if name == '_data':
+            raise AttributeError(name)
+
+        key = self._find_key(name)
+        value = convert_value(key, self._data[key])
+        _instance_dict(self)[name] = value
+        return value
+
+    @property
+    def __dict__(self):
+        return self._materialize()
+
+    def _materialize(self):
+        """Convert all fields that were not accessed yet, keeping the
+        fields in the order of the row as a plain Response does"""
+        attributes = _instance_dict(self)
+        if all(convert_key(key) in attributes for key in self._data):
+            return attributes
+
+        converted = dict(attributes)
+        attributes.clear()
+        for key, value in self._data.items():
+            name = convert_key(key)
+            if name in converted:
+                attributes[name] = converted.pop(name)
+            else:
+                attributes[name] = convert_value(key, value)
+        # Attributes set on the item itself
+        attributes.update(converted)
+        return attributes
+
+    def __dir__(self):
+        return list(super().__dir__()) + [
+            convert_key(key) for key in self._data
+        ]
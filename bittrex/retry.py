@@ -0,0 +1,131 @@
+import random
+from .exceptions import ResponseError, RequestError, HTTPStatusError
+from .endpoints import ENDPOINTS_BY_PATH
+
+TRANSIENT = 'transient'
+THROTTLED = 'throttled'
+PERMANENT = 'permanent'
+
+# Endpoints that can be sent again without side effects. Orders,
+# cancels and withdrawals are never retried.
+IDEMPOTENT_ENDPOINTS = frozenset(
+    path for path, endpoint in ENDPOINTS_BY_PATH.items()
+    if endpoint.idempotent
+)
+
+# success false messages worth asking again for, anything else, eg.
+# INVALID_MARKET or APIKEY_INVALID, is permanent
+THROTTLED_MESSAGES = frozenset(['THROTTLED', 'RATE_LIMIT_EXCEEDED'])
+TRANSIENT_MESSAGES = frozenset(['ADDRESS_GENERATING', 'SERVER_ERROR'])
+
+# attempts, base delay and maximum delay in seconds
+DEFAULT_POLICY = (3, 0.1, 5.0)
+
+
+def classify(error):
+    """Returns TRANSIENT, THROTTLED or PERMANENT for a raised error"""
+    if isinstance(error, HTTPStatusError):
+        if error.status == 429:
+            return THROTTLED
+        elif error.status >= 500:
+            return TRANSIENT
+        return PERMANENT
+    elif isinstance(error, RequestError):
+        return classify_message(str(error))
+    elif isinstance(error, ResponseError):
+        # Connection resets, disconnects and timeouts
+        return TRANSIENT
+    return PERMANENT
+
+
+def classify_message(message):
+    """Returns TRANSIENT, THROTTLED or PERMANENT for the message of a
+    success false response"""
+    if message in THROTTLED_MESSAGES:
+        return THROTTLED
+    elif message in TRANSIENT_MESSAGES:
+        return TRANSIENT
+    return PERMANENT
+
+
+class EndpointRetry:
+    """Number of attempts and backoff of a single endpoint"""
+
+    def __init__(self, attempts, base_delay=0.1, max_delay=5.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.failures = 0
+
+    def delay(self, attempt, kind):
+        """Jittered exponential backoff before retry number attempt + 1,
+        throttled requests back off twice as long"""
+        bound = self.base_delay * 2 ** attempt
+        if kind == THROTTLED:
+            bound *= 2
+        return random.uniform(0, min(bound, self.max_delay))
+
+
+class RetryPolicy:
+    """Decides whether and when a failed request is sent again
+
+    Only IDEMPOTENT_ENDPOINTS are retried and only on transient or
+    throttled errors, with full jitter exponential backoff.
+
+    :param policies: dict of endpoint to (attempts, base_delay,
+        max_delay) overriding the default, an attempts of 1 disables
+        retries for the endpoint
+    :param default: (attempts, base_delay, max_delay) of the other
+        idempotent endpoints
+    """
+
+    def __init__(self, policies=None, default=DEFAULT_POLICY):
+        policies = policies or {}
+
+        for endpoint in policies:
+            if endpoint not in IDEMPOTENT_ENDPOINTS:
+                raise ValueError(f'{endpoint} is not safe to retry')
+
+        self.policies = {
+            endpoint: EndpointRetry(*policies.get(endpoint, default))
+            for endpoint in IDEMPOTENT_ENDPOINTS
+        }
+
+    def delay(self, endpoint, attempt, error=None, data=None):
+        """Returns the seconds to wait before sending the request again,
+        or None when it should not be retried
+
+        :param endpoint: api method, eg. public/getticker
+        :param attempt: number of the failed attempt, starting at 0
+        :param error: the raised exception, if any
+        :param data: the decoded response, if any
+        """
+        if error is None and data['success']:
+            return None
+
+        policy = self.policies.get(endpoint)
+        if policy is None:
+            return None
+
+        if error is not None:
+            kind = classify(error)
+        else:
+            kind = classify_message(data['message'])
+
+        if kind == PERMANENT or attempt + 1 >= policy.attempts:
+            policy.failures += 1
+            return None
+
+        policy.retries += 1
+        return policy.delay(attempt, kind)
+
+    def metrics(self):
+        """Retry and given up counters per endpoint"""
+        return {
+            endpoint: {
+                'retries': policy.retries,
+                'failures': policy.failures,
+            }
+            for endpoint, policy in self.policies.items()
+        }
@@ -1,114 +1,575 @@
 from .base import BittrexBaseSession
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import requests
-from .exceptions import ResponseError, RequestError
+from requests.adapters import HTTPAdapter
+from .exceptions import ResponseError, RequestError, HTTPStatusError
+from .records import (
+    Market, Currency, MarketSummary, Trade, OrderBook, OrderBookEntry,
+    Candle
+)
+from .summaries import SummaryPoller
+from .endpoints import add_endpoint_methods, sync_method
+from .columns import CANDLE_COLUMNS, TRADE_COLUMNS
+from .stream import ResultStream
 
 
 class BittrexSession(BittrexBaseSession):
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, connect_timeout=None, read_timeout=None,
+                 keep_alive=True, thread_safe=False, max_workers=None,
+                 **kwargs):
+        """Initialise session
+
+        :param pool_connections: number of host pools to cache
+        :param pool_maxsize: connections kept open per host
+        :param pool_block: wait for a free pooled connection instead of
+            opening a throwaway one when the pool is exhausted
+        :param connect_timeout: seconds to wait for a connection
+        :param read_timeout: seconds to wait for the response
+        :param keep_alive: reuse connections between requests
+        :param thread_safe: give every thread its own requests session,
+            all sharing one connection pool, so a single BittrexSession
+            can be used from many threads
+        :param max_workers: size of the thread pool used by map_markets,
+            defaults to pool_maxsize
+        """
         super().__init__(*args, **kwargs)
-        self.session = requests.session()
+        self.timeout = (connect_timeout, read_timeout)
+        self.keep_alive = keep_alive
+        self.thread_safe = thread_safe
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block
+        )
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        self._session = None if thread_safe else self._new_session()
+        self.max_workers = max_workers or pool_maxsize
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._registry_lock = threading.Lock()
+        self._registry_refresh = None
 
-    def _get(self, url, payload=None):
-        """HTTP GET request"""
+    def _new_session(self):
+        """Create a requests session using the shared connection pool"""
+        session = requests.session()
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+
+        with self._sessions_lock:
+            self._sessions.append(session)
+        return session
+
+    @property
+    def session(self):
+        """requests session for the calling thread
+
+        The map_markets worker threads and the registry refresh thread
+        always use their own requests sessions on the shared connection
+        pool. Other threads share one unless the session is thread_safe.
+        """
+        session = getattr(self._local, 'session', None)
+        if session is not None:
+            return session
+
+        if not self.thread_safe:
+            return self._session
+
+        session = self._local.session = self._new_session()
+        return session
+
+    @session.setter
+    def session(self, session):
+        # A thread_safe session only replaces that of the calling thread
+        if self.thread_safe:
+            self._local.session = session
+        else:
+            self._session = session
+
+    def _own_session(self):
+        """Give the calling thread its own requests session"""
+        self._local.session = self._new_session()
+
+    @property
+    def executor(self):
+        """Thread pool shared by all batch calls, created on first use"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, initializer=self._own_session
+                )
+            return self._executor
+
+    def close(self):
+        """Close the thread pool, all sessions and pooled connections"""
+        if self._registry_refresh is not None:
+            self._registry_refresh.set()
+            self._registry_refresh = None
+
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+
+        for session in sessions:
+            session.close()
+        self.adapter.close()
+
+    def _request(self, url, payload=None):
+        """HTTP GET request returning the decoded json"""
+
+        cache_key = self._cache_key(url)
+        if cache_key is not None:
+            cached = self.cache.get(*cache_key)
+            if cached is not None:
+                return cached
+
+        json_response = self._fetch_with_retry(url, payload)
+
+        if cache_key is not None and json_response['success']:
+            self.cache.set(*cache_key, json_response)
+        return json_response
+
+    def _fetch_with_retry(self, url, payload=None):
+        """Fetch url, sending it again after transient errors as far as
+        the retry policy allows"""
+        attempt = 0
+        while True:
+            try:
+                json_response = self._fetch(url, payload)
+            except ResponseError as e:
+                delay = self._retry_delay(url, attempt, error=e)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(url, attempt, data=json_response)
+                if delay is None:
+                    return json_response
+
+            time.sleep(delay)
+            url = self._renew_nonce(url)
+            attempt += 1
+
+    def _fetch(self, url, payload=None):
+        """Send the request and decode the response"""
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self._priority(url))
 
         headers = {'apisign': self._sign_url(url)}
-        response = self.session.get(url, json=payload, headers=headers)
+        start = time.perf_counter()
+        try:
+            response = self.session.get(
+                url, json=payload, headers=headers, timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            raise ResponseError(f'{url}: {type(e).__name__} {e}')
 
         if response.status_code != requests.codes.ok:
-            raise ResponseError(
-                f'{response.url} {response.status_code}: {response.content}'
+            raise HTTPStatusError(
+                f'{response.url} {response.status_code}: {response.content}',
+                response.status_code
+            )
+
+        body = response.content
+        # elapsed runs until the headers were parsed
+        ttfb = response.elapsed.total_seconds()
+        read = time.perf_counter() - start - ttfb
+        return self._decode(url, body, ttfb, read)
+
+    def _get(self, url, payload=None, record=None):
+        """HTTP GET request"""
+        json_response = self._request(url, payload)
+        return self._parse(url, json_response, record)
+
+    def _stream(self, url, record=None, chunk_size=65536):
+        """HTTP GET request yielding result items while the body arrives"""
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self._priority(url))
+
+        headers = {'apisign': self._sign_url(url)}
+        try:
+            response = self.session.get(
+                url, headers=headers, timeout=self.timeout, stream=True
             )
+        except requests.exceptions.RequestException as e:
+            raise ResponseError(f'{url}: {type(e).__name__} {e}')
 
-        json_response = response.json()
+        with response:
+            if response.status_code != requests.codes.ok:
+                raise HTTPStatusError(
+                    f'{response.url} {response.status_code}: '
+                    f'{response.content}',
+                    response.status_code
+                )
 
-        return self._parse_response(json_response)
+            from_dict = self._result_class(record).from_dict
+            parser = ResultStream()
+            try:
+                for chunk in response.iter_content(chunk_size):
+                    for row in parser.feed(chunk):
+                        yield from_dict(row)
+            except requests.exceptions.RequestException as e:
+                raise ResponseError(f'{url}: {type(e).__name__} {e}')
+
+            for row in parser.close():
+                yield from_dict(row)
 
     def get_markets(self, market_name=None):
-        """Added our own get single market option"""
+        """Added our own get single market option
+
+        A single market is looked up in the market registry, which is
+        only reloaded when it is stale.
+        """
+        if market_name is not None:
+            with self._registry_lock:
+                if self.registry.stale:
+                    self.load_registry()
+            return self.registry.get(market_name)
+
         url = self._get_markets()
+        return self._get(url, record=Market)
 
-        markets = self._get(url)
+    def load_registry(self):
+        """Retrieve all markets and currencies into the market registry"""
+        markets = self._get(self._get_markets(), record=Market)
+        currencies = self._get(self._get_currencies(), record=Currency)
+        self.registry.load(markets, currencies)
 
-        if market_name is not None:
-            for market in markets:
-                if market_name == market.market_name:
-                    break
-            else:
-                raise RequestError(f'Could not find {market_name}')
+    def start_registry_refresh(self, interval=None):
+        """Reload the market registry in a background thread
 
-            return market
-        else:
-            return markets
+        :param interval: seconds between reloads, defaults to the
+            registry ttl
+        """
+        if self._registry_refresh is not None:
+            return
+
+        interval = interval or self.registry.ttl
+        stop = threading.Event()
+
+        def refresh():
+            # Never share the requests session of the calling thread
+            self._own_session()
+            while not stop.wait(interval):
+                try:
+                    with self._registry_lock:
+                        self.load_registry()
+                except (RequestError, ResponseError, ValueError,
+                        requests.RequestException):
+                    # ValueError is raised on a body that fails to decode.
+                    # Keep the last registry, get_markets reloads it once
+                    # it goes stale
+                    pass
+
+        thread = threading.Thread(target=refresh, daemon=True)
+        thread.start()
+        self._registry_refresh = stop
 
-    def get_market_summaries(self, market_name=None):
-        url = self._get_market_summaries(market_name)
-        return self._get(url)
+    def get_market_history(self, market_name, as_columns=False):
+        """Retrieve the latest trades for given market_name
 
-    def get_market_history(self, market_name):
+        :param as_columns: return a dict of numpy arrays instead of items
+        """
         url = self._get_market_history(market_name)
-        return self._get(url)
 
-    def get_currencies(self):
-        url = self._get_currencies()
-        return self._get(url)
+        if as_columns:
+            return self._parse_columns(self._request(url), TRADE_COLUMNS)
+        return self._get(url, record=Trade)
 
-    def get_ticker(self, market_name):
-        url = self._get_ticker(market_name)
-        return self._get(url)
+    def get_order_book(self, market_name, order_type='both',
+                       as_book=False):
+        """Retrieve orderbook of given market
+
+        :param as_book: return a LocalOrderBook of both sides instead of
+            items
+        """
+        if as_book:
+            url = self._get_order_book(market_name, 'both')
+            json_response = self._request(url)
+            return self._parse_order_book(json_response, market_name)
 
-    def get_order_book(self, market_name, order_type='both'):
         url = self._get_order_book(market_name, order_type)
-        return self._get(url)
+        record = OrderBook if order_type == 'both' else OrderBookEntry
+        return self._get(url, record=record)
+
+    def update_order_book(self, book):
+        """Refresh a LocalOrderBook from a new snapshot of its market
+
+        The book is updated in place with only the levels that changed.
+        """
+        url = self._get_order_book(book.market_name, 'both')
+        json_response = self._request(url)
+        return self._parse_order_book(json_response, book.market_name, book)
+
+    def get_candles(self, market_name, tick_interval, as_columns=False):
+        """Retrieve candles for given market_name
+
+        :param as_columns: return a dict of numpy arrays instead of items
+        """
+        url = self._get_candles(market_name, tick_interval)
+
+        if as_columns:
+            return self._parse_columns(self._request(url), CANDLE_COLUMNS)
+        return self._get(url, record=Candle)
+
+    def get_latest_candle(self, market_name, tick_interval,
+                          as_columns=False):
+        url = self._get_latest_candle(market_name, tick_interval)
+
+        if as_columns:
+            return self._parse_columns(self._request(url), CANDLE_COLUMNS)
+        return self._get(url, record=Candle)
+
+    def update_candles(self, store):
+        """Bring a CandleStore up to date
+
+        An empty store gets the full history, after that only the latest
+        candle is retrieved. When candles went missing in between, the
+        history is retrieved again but only the missing window, starting
+        at the newest stored candle, is merged.
+
+        Only the latest candle is replaced on every update. A candle that
+        closed between two updates keeps the values last observed for it,
+        trades in its final moments are missing, unless a gap made the
+        update retrieve the history again.
+        """
+        market_name, tick_interval = store.market_name, store.tick_interval
+
+        if not len(store):
+            store.extend(self.get_candles(
+                market_name, tick_interval, as_columns=True
+            ))
+            return store
+
+        latest = self.get_latest_candle(
+            market_name, tick_interval, as_columns=True
+        )
+
+        gap = store.gap(latest)
+        if gap is not None:
+            history = self.get_candles(
+                market_name, tick_interval, as_columns=True
+            )
+            store.extend(history, *gap)
+
+        store.extend(latest)
+        return store
+
+    def update_archive(self, archive):
+        """Append new candles or trades to a CandleArchive or TradeArchive
+
+        :returns: number of rows appended
+        """
+        method, args = archive.source
+        columns = getattr(self, method)(*args, as_columns=True)
+        return archive.append(columns)
+
+    def map_markets(self, method, markets, *args, max_workers=None,
+                    **kwargs):
+        """Call method for every market on the shared thread pool
+
+        Returns a dict of market to result in the order of markets. A
+        market that fails maps to the raised exception instead.
 
-    def buy_limit(self, market_name, quantity, rate):
-        url = self._buy_limit(market_name, quantity, rate)
-        return self._get(url)
+        :param method: per market method, eg. self.get_ticker
+        :param markets: iterable of market names
+        :param max_workers: maximum number of calls in flight, defaults to
+            the size of the shared thread pool
+        """
+        markets = list(markets)
+        max_workers = max_workers or self.max_workers
+        executor = self.executor
 
-    def sell_limit(self, market_name, quantity, rate):
-        url = self._sell_limit(market_name, quantity, rate)
-        return self._get(url)
+        results = {}
+        pending = {}
+        queued = iter(markets)
 
-    def cancel_order(self, uuid):
-        url = self._cancel_order(uuid)
-        return self._get(url)
+        def submit():
+            for market in queued:
+                future = executor.submit(method, market, *args, **kwargs)
+                pending[future] = market
+                if len(pending) >= max_workers:
+                    break
+
+        submit()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                market = pending.pop(future)
+                try:
+                    results[market] = future.result()
+                except Exception as e:
+                    results[market] = e
+            submit()
+
+        return {market: results[market] for market in markets}
+
+    def get_tickers(self, markets, max_workers=None):
+        return self.map_markets(
+            self.get_ticker, markets, max_workers=max_workers
+        )
+
+    def get_order_books(self, markets, order_type='both', max_workers=None):
+        return self.map_markets(
+            self.get_order_book, markets, order_type, max_workers=max_workers
+        )
+
+    def get_candles_many(self, markets, tick_interval, max_workers=None,
+                         as_columns=False):
+        return self.map_markets(
+            self.get_candles, markets, tick_interval,
+            max_workers=max_workers, as_columns=as_columns
+        )
+
+    def _place_order(self, order_type, market_name, quantity, rate):
+        if order_type == 'buy':
+            return self.buy_limit(market_name, quantity, rate)
+        elif order_type == 'sell':
+            return self.sell_limit(market_name, quantity, rate)
+        raise RequestError(f'Unknown order type {order_type}')
+
+    def place_orders(self, orders, max_workers=None):
+        """Place limit orders concurrently
+
+        Placing is never retried. Orders whose request failed without a
+        clear answer are looked up among the open orders of their market
+        afterwards, ignoring the orders that were already open before the
+        batch. Those are retrieved first, so a batch starts with one
+        getopenorders request.
+
+        :param orders: (order_type, market_name, quantity, rate) tuples,
+            order_type being buy or sell
+        :returns: list with the buy_limit/sell_limit result or the raised
+            exception of every order
+        """
+        orders = list(orders)
+        known = {order.order_uuid for order in self.get_open_orders()}
+        results = self.map_markets(
+            lambda index: self._place_order(*orders[index]),
+            range(len(orders)), max_workers=max_workers
+        )
+        report = [results[index] for index in range(len(orders))]
+
+        markets = {
+            orders[index][1] for index in self._ambiguous_orders(report)
+        }
+        if markets:
+            open_orders = self.map_markets(
+                self.get_open_orders, markets, max_workers=max_workers
+            )
+            open_orders = {
+                market: orders for market, orders in open_orders.items()
+                if not isinstance(orders, Exception)
+            }
+            self._reconcile_orders(orders, report, open_orders, known)
+        return report
+
+    def _cancel_order_safely(self, uuid, attempts=3):
+        """Cancel an order, looking at its state before a retry so a cancel
+        without a clear answer is not sent twice"""
+        for attempt in range(attempts):
+            try:
+                self.cancel_order(uuid)
+                return True
+            except RequestError as e:
+                if str(e) == 'ORDER_NOT_OPEN':
+                    return True
+                raise
+            except ResponseError as e:
+                error = e
+
+            if self._order_settled(self.get_order(uuid)):
+                return True
+        raise error
 
-    def get_open_orders(self, market_name=None):
-        url = self._get_open_orders(market_name)
-        return self._get(url)
+    def cancel_orders(self, uuids, max_workers=None, attempts=3):
+        """Cancel orders concurrently
 
-    def get_order(self, uuid):
-        url = self._get_order(uuid)
-        return self._get(url)
+        :param uuids: uuids of the orders to cancel, each is cancelled
+            once however often it is listed
+        :param attempts: cancel requests per order at most
+        :returns: dict of uuid to True once the order is cancelled or no
+            longer open, or the raised exception
+        """
+        if attempts < 1:
+            raise ValueError('attempts must be at least 1')
 
-    def get_order_history(self, market_name=None):
-        url = self._get_order_history(market_name)
-        return self._get(url)
+        return self.map_markets(
+            self._cancel_order_safely, list(dict.fromkeys(uuids)), attempts,
+            max_workers=max_workers
+        )
 
-    def get_balances(self, currency=None):
-        url = self._get_balances(currency)
-        return self._get(url)
+    def cancel_all(self, market_name=None, max_workers=None):
+        """Cancel all open orders, optionally only those of market_name"""
+        open_orders = self.get_open_orders(market_name)
+        return self.cancel_orders(
+            [order.order_uuid for order in open_orders],
+            max_workers=max_workers
+        )
 
-    def get_deposit_address(self, currency):
-        url = self._get_deposit_address(currency)
-        return self._get(url)
+    def get_orders(self, uuids, max_workers=None):
+        """Retrieve orders concurrently, returns a dict of uuid to order or
+        the raised exception"""
+        return self.map_markets(
+            self.get_order, uuids, max_workers=max_workers
+        )
 
-    def withdraw(self, currency, quantity, address, payment_id=None):
-        url = self._withdraw(currency, quantity, address, payment_id)
-        return self._get(url)
+    def poll_market_summaries(self, min_interval=1.0, max_interval=30.0,
+                              poller=None):
+        """Poll the market summaries, yielding only what changed
 
-    def get_withdrawal_history(self, currency=None):
-        url = self._get_withdrawal_history(currency)
-        return self._get(url)
+        The first poll reports every market as added. Polls without
+        changes yield nothing, see SummaryPoller for the diffing and the
+        poll interval.
 
-    def get_deposit_history(self, currency=None):
-        url = self._get_deposit_history(currency)
-        return self._get(url)
+        :param poller: SummaryPoller to continue from, eg. after an error
+        :returns: iterator of MarketChanges
+        """
+        if poller is None:
+            poller = SummaryPoller(min_interval, max_interval)
 
-    def get_candles(self, market_name, tick_interval):
+        url = self._get_market_summaries()
+        from_dict = self._result_class(MarketSummary).from_dict
+        while True:
+            json_response = self._request(url)
+            if json_response['success'] is False:
+                raise RequestError(json_response['message'])
+
+            changes = poller.diff(json_response['result'], from_dict)
+            if changes:
+                yield changes
+            time.sleep(poller.next_interval(changes))
+
+    def iter_market_history(self, market_name):
+        """Yield the latest trades of market_name while they are received"""
+        url = self._get_market_history(market_name)
+        return self._stream(url, record=Trade)
+
+    def iter_order_book(self, market_name, order_type='buy'):
+        """Yield the order book entries of market_name while they are
+        received. order_type both yields a single OrderBook once the
+        full response is in."""
+        url = self._get_order_book(market_name, order_type)
+        record = OrderBook if order_type == 'both' else OrderBookEntry
+        return self._stream(url, record=record)
+
+    def iter_candles(self, market_name, tick_interval):
+        """Yield the candles of market_name while they are received"""
         url = self._get_candles(market_name, tick_interval)
-        return self._get(url)
+        return self._stream(url, record=Candle)
 
-    def get_latest_candle(self, market_name, tick_interval):
-        url = self._get_latest_candle(market_name, tick_interval)
-        return self._get(url)
+
+add_endpoint_methods(BittrexSession, sync_method)
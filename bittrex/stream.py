@@ -0,0 +1,90 @@
+import codecs
+import json
+import re
+from .exceptions import RequestError, ResponseError
+
+_RESULT_LIST = re.compile(r'"result"\s*:\s*\[')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+class ResultStream:
+    """Incremental parser for the result list of a bittrex response
+
+    Feed it the response body in chunks and it returns the rows of the
+    result list as soon as they are complete, so only about one chunk of
+    the body is held in memory. Responses whose result is not a list are
+    buffered and parsed completely on close.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._in_list = False
+        self._done = False
+        self._scanned = 0
+
+    def feed(self, chunk):
+        """Returns the rows completed by chunk"""
+        self._buffer += self._text.decode(chunk)
+
+        if not self._in_list:
+            match = _RESULT_LIST.search(self._buffer, self._scanned)
+            if match is None:
+                # Rescan the tail, it might hold the start of the key
+                self._scanned = max(0, len(self._buffer) - 64)
+                return []
+            self._in_list = True
+            self._buffer = self._buffer[match.end():]
+
+        if self._done:
+            return []
+        return self._rows()
+
+    def _rows(self):
+        rows = []
+        buffer = self._buffer
+        position = 0
+
+        while True:
+            position = _SEPARATORS.match(buffer, position).end()
+            if position == len(buffer):
+                break
+
+            if buffer[position] == ']':
+                self._done = True
+                break
+
+            try:
+                row, position = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Row not complete yet
+                break
+            rows.append(row)
+
+        self._buffer = buffer[position:]
+        return rows
+
+    def close(self):
+        """Returns the remaining rows once the body has been fed"""
+        self._buffer += self._text.decode(b'', final=True)
+
+        if self._in_list:
+            if not self._done:
+                raise ResponseError(
+                    f'Parsing failed: incomplete result {self._buffer[:100]}'
+                )
+            return []
+
+        data = json.loads(self._buffer)
+        if data['success'] is False:
+            raise RequestError(data['message'])
+
+        result = data['result']
+        if isinstance(result, list):
+            return result
+        elif isinstance(result, dict):
+            return [result]
+        elif result is None:
+            return []
+        raise ResponseError(f"Parsing failed: {data}")
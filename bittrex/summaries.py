@@ -0,0 +1,100 @@
+STAMP_FIELDS = ('TimeStamp', 'LastUpdated')
+
+
+class MarketChanges:
+    """Markets that changed between two getmarketsummaries snapshots
+
+    :param added: summary items of markets that were not listed before
+    :param changed: summary items of markets with new values
+    :param removed: names of markets that are no longer listed
+    """
+    __slots__ = ('added', 'changed', 'removed')
+
+    def __init__(self, added=(), changed=(), removed=()):
+        self.added = list(added)
+        self.changed = list(changed)
+        self.removed = list(removed)
+
+    def __len__(self):
+        return len(self.added) + len(self.changed) + len(self.removed)
+
+    def __repr__(self):
+        return (f'<MarketChanges added={len(self.added)} '
+                f'changed={len(self.changed)} removed={len(self.removed)}>')
+
+
+def _digest(row):
+    """Hash of the values of a summary row besides its timestamps"""
+    return hash(tuple(
+        value for key, value in row.items() if key not in STAMP_FIELDS
+    ))
+
+
+class SummaryPoller:
+    """Keeps the last getmarketsummaries snapshot and diffs new ones
+
+    Per market only the timestamp and a hash of the other fields are
+    kept. A row with an unchanged timestamp is skipped without hashing,
+    a row with a new timestamp but the same hash is not reported, and
+    only reported rows are converted to items.
+
+    The poll interval grows while nothing changes and halves once
+    markets change, staying between min_interval and max_interval.
+
+    :param min_interval: shortest seconds between polls
+    :param max_interval: longest seconds between polls
+    :param backoff: factor the interval grows by after a quiet poll
+    """
+
+    def __init__(self, min_interval=1.0, max_interval=30.0, backoff=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.snapshot = {}
+
+    def diff(self, rows, from_dict):
+        """Update the snapshot with new rows
+
+        :param rows: decoded getmarketsummaries result
+        :param from_dict: builds the item of a reported row
+        :returns: MarketChanges
+        """
+        snapshot = self.snapshot
+        changes = MarketChanges()
+        seen = set()
+
+        for row in rows:
+            name = row['MarketName']
+            seen.add(name)
+            stamp = row.get('TimeStamp') or row.get('LastUpdated')
+            previous = snapshot.get(name)
+
+            if (previous is not None and stamp is not None
+                    and previous[0] == stamp):
+                continue
+
+            digest = _digest(row)
+            snapshot[name] = (stamp, digest)
+
+            if previous is None:
+                changes.added.append(from_dict(row))
+            elif previous[1] != digest:
+                changes.changed.append(from_dict(row))
+
+        if len(seen) != len(snapshot):
+            for name in [name for name in snapshot if name not in seen]:
+                del snapshot[name]
+                changes.removed.append(name)
+
+        return changes
+
+    def next_interval(self, changes):
+        """Seconds to wait before the next poll"""
+        if changes:
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(
+                self.max_interval, self.interval * self.backoff
+            )
+        return self.interval
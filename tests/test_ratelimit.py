@@ -0,0 +1,60 @@
+import asyncio
+import threading
+from time import monotonic
+
+import pytest
+
+from bittrex.asyncsession import BittrexAsyncSession, WARM_UP_CONNECTIONS
+from bittrex.ratelimit import RateLimiter, AsyncRateLimiter
+from bittrex.session import BittrexSession
+from benchmarks.server import StandInServer
+
+
+@pytest.mark.parametrize('rate', [0.5, 0.1])
+def test_fractional_rates_let_a_request_through(rate):
+    limiter = RateLimiter(rate)
+    acquiring = threading.Thread(target=limiter.acquire, daemon=True)
+    acquiring.start()
+    acquiring.join(1)
+
+    assert not acquiring.is_alive()
+    assert limiter.bucket.delay() == pytest.approx(1 / rate, rel=0.01)
+
+
+def test_async_fractional_rate_lets_a_request_through():
+    limiter = AsyncRateLimiter(0.5)
+    started = monotonic()
+    asyncio.run(asyncio.wait_for(limiter.acquire(), 1))
+
+    assert monotonic() - started < 0.1
+
+
+def test_fractional_rate_spaces_requests():
+    limiter = RateLimiter(20, burst=0.5)
+    started = monotonic()
+    for _ in range(3):
+        limiter.acquire()
+
+    assert monotonic() - started == pytest.approx(0.1, abs=0.05)
+
+
+@pytest.mark.parametrize('rate_limit', [0, -1])
+def test_rate_limit_must_be_positive(rate_limit):
+    with pytest.raises(ValueError):
+        BittrexSession('key', 'secret', rate_limit=rate_limit)
+
+
+def test_warm_up_opens_a_few_rate_limited_connections():
+    async def warm_up(server):
+        session = server.attach(
+            BittrexAsyncSession('key', 'secret', rate_limit=100)
+        )
+        async with session:
+            opened = await session.warm_up()
+        return opened, session.rate_limiter.metrics()['public']['requests']
+
+    with StandInServer() as server:
+        opened, limited = asyncio.run(warm_up(server))
+
+    assert opened == limited == WARM_UP_CONNECTIONS
+    assert server.connections == WARM_UP_CONNECTIONS
@@ -0,0 +1,116 @@
+import asyncio
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from bittrex.asyncsession import BittrexAsyncSession
+from bittrex.exceptions import ResponseError, RequestError
+from bittrex.retry import (
+    RetryPolicy, classify, TRANSIENT, THROTTLED, PERMANENT
+)
+from bittrex.session import BittrexSession
+from benchmarks.server import (
+    StandInServer, STATUS, THROTTLE, FAILURE, DISCONNECT
+)
+
+ATTEMPTS = 3
+# FAILURE answers success false, which raises a RequestError
+ERRORS = (ResponseError, RequestError)
+CLASSES = [
+    (STATUS, TRANSIENT),
+    (THROTTLE, THROTTLED),
+    (FAILURE, PERMANENT),
+    (DISCONNECT, TRANSIENT),
+]
+
+
+def retry_policy():
+    return RetryPolicy(default=(ATTEMPTS, 0.0, 0.0))
+
+
+def failing_server(error):
+    return StandInServer(error_rate=1.0, errors=(error,))
+
+
+def nonces(paths):
+    return [parse_qs(urlsplit(path).query)['nonce'][0] for path in paths]
+
+
+def call_async(server, method, *args):
+    async def call():
+        session = server.attach(
+            BittrexAsyncSession('key', 'secret', retry=retry_policy())
+        )
+        async with session:
+            return await getattr(session, method)(*args)
+
+    return asyncio.run(call())
+
+
+@pytest.mark.parametrize('error, kind', CLASSES)
+def test_injected_errors_are_classified(error, kind):
+    with failing_server(error) as server:
+        session = server.attach(BittrexSession('key', 'secret'))
+        with pytest.raises(ERRORS) as raised:
+            session.get_ticker('BTC-LTC')
+        session.close()
+
+    assert classify(raised.value) == kind
+
+
+@pytest.mark.parametrize('error, kind', CLASSES)
+def test_async_injected_errors_are_classified(error, kind):
+    with failing_server(error) as server:
+        with pytest.raises(ERRORS) as raised:
+            call_async(server, 'get_ticker', 'BTC-LTC')
+
+    assert classify(raised.value) == kind
+
+
+@pytest.mark.parametrize('error, kind', CLASSES)
+def test_only_transient_and_throttled_errors_are_retried(error, kind):
+    with failing_server(error) as server:
+        session = server.attach(
+            BittrexSession('key', 'secret', retry=retry_policy())
+        )
+        with pytest.raises(ERRORS):
+            session.get_ticker('BTC-LTC')
+        session.close()
+
+    assert server.requests == (1 if kind == PERMANENT else ATTEMPTS)
+
+
+@pytest.mark.parametrize('error', [STATUS, THROTTLE, DISCONNECT])
+def test_orders_are_never_resent(error):
+    with failing_server(error) as server:
+        session = server.attach(
+            BittrexSession('key', 'secret', retry=retry_policy())
+        )
+        with pytest.raises(ResponseError):
+            session.buy_limit('BTC-LTC', 1, 0.01)
+        session.close()
+
+        with pytest.raises(ResponseError):
+            call_async(server, 'sell_limit', 'BTC-LTC', 1, 0.01)
+
+    assert server.requests == 2
+
+
+def test_retried_calls_get_a_fresh_nonce():
+    with failing_server(STATUS) as server:
+        session = server.attach(
+            BittrexSession('key', 'secret', retry=retry_policy())
+        )
+        with pytest.raises(ResponseError):
+            session.get_balances('BTC')
+        session.close()
+
+        assert server.requests == ATTEMPTS
+        assert len(set(nonces(server.paths))) == ATTEMPTS
+
+        server.reset()
+        with pytest.raises(ResponseError):
+            call_async(server, 'get_balances', 'BTC')
+
+        assert server.requests == ATTEMPTS
+        assert len(set(nonces(server.paths))) == ATTEMPTS
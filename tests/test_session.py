@@ -0,0 +1,94 @@
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bittrex.session import BittrexSession
+from benchmarks.server import StandInServer, default_routes
+
+THREADS = 16
+CALLS = 20
+POOL_MAXSIZE = 4
+
+
+def test_thread_safe_session_shares_one_pool():
+    with StandInServer(latency=0.001) as server:
+        session = server.attach(BittrexSession(
+            'key', 'secret', thread_safe=True, pool_maxsize=POOL_MAXSIZE,
+            pool_block=True
+        ))
+
+        def calls(_):
+            return [session.get_ticker('BTC-LTC') for _ in range(CALLS)]
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            results = [
+                ticker for tickers in executor.map(calls, range(THREADS))
+                for ticker in tickers
+            ]
+        session.close()
+
+        assert len(results) == THREADS * CALLS
+        assert all(ticker.bid == 0.01924994 for ticker in results)
+        assert server.requests == THREADS * CALLS
+        assert server.connections <= POOL_MAXSIZE
+
+
+def test_batch_calls_keep_the_assigned_session():
+    with StandInServer() as server:
+        session = server.attach(BittrexSession('key', 'secret'))
+        custom = requests.Session()
+        session.session = custom
+
+        results = session.map_markets(session.get_ticker, ['BTC-LTC'] * 4)
+        session.get_ticker('BTC-LTC')
+        session.close()
+
+        assert not any(isinstance(result, Exception)
+                       for result in results.values())
+        assert session.session is custom
+        assert not session.thread_safe
+
+
+def test_only_unsigned_calls_are_cached():
+    with StandInServer() as server:
+        session = server.attach(BittrexSession('key', 'secret', cache=True))
+        for _ in range(2):
+            session.get_ticker('BTC-LTC')
+        assert server.requests == 1
+
+        server.reset()
+        for _ in range(2):
+            session.get_order_book('BTC-LTC')
+        session.close()
+        assert server.requests == 2
+
+
+def test_registry_refresh_survives_undecodable_bodies():
+    routes = default_routes()
+    routes['public/getmarkets'] = b'<html>maintenance</html>'
+
+    with StandInServer(routes=routes) as server:
+        session = server.attach(BittrexSession('key', 'secret'))
+        session.start_registry_refresh(interval=0.01)
+        time.sleep(0.1)
+        requests_before = server.requests
+        time.sleep(0.1)
+        session_count = len(session._sessions)
+        session.close()
+
+        assert server.requests > requests_before > 0
+        # The caller's session and one for the refresh thread
+        assert session_count == 2
+
+
+def test_generated_methods_show_their_arguments():
+    signature = inspect.signature(BittrexSession.buy_limit)
+    assert list(signature.parameters) == [
+        'self', 'market_name', 'quantity', 'rate'
+    ]
+
+    session = BittrexSession('key', 'secret')
+    assert str(inspect.signature(session.get_balances)) == '(currency=None)'
+    session.close()